@@ -0,0 +1,28 @@
+import argparse
+
+from utils.rag_store import ingest, settings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sync the persistent RAG collection used by retrieve_context"
+    )
+    parser.add_argument(
+        "urls", nargs="*", help=f"pages to ingest (default: {settings.rag_sources})"
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="drop stored sources missing from the given urls (always on without urls)",
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="rebuild the collection from scratch"
+    )
+    args = parser.parse_args()
+    stats = ingest(args.urls or None, prune=args.prune or not args.urls, full=args.full)
+    print(
+        f"{len(stats.changed_sources)} changed, "
+        f"{len(stats.unchanged_sources)} unchanged, "
+        f"{len(stats.removed_sources)} removed sources; "
+        f"{stats.added_chunks} chunks added, {stats.deleted_chunks} deleted, "
+        f"{stats.kept_chunks} kept in {settings.rag_persist_dir}"
+    )
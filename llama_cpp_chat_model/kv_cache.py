@@ -0,0 +1,99 @@
+import hashlib
+import queue
+import threading
+from typing import Iterator, Sequence
+
+import diskcache
+import numpy as np
+from llama_cpp import BaseLlamaCache, LlamaState
+
+from llama_cpp_chat_model.prefix_cache import compact_state
+
+
+class KVStateStore(BaseLlamaCache):
+    """Persistent llama.cpp state cache keyed by hashes of token prefixes.
+
+    Prefixes are hashed at every ``block_size`` boundary, so the longest cached
+    prefix of a prompt is found with one lookup per block instead of a scan over
+    all stored keys. Entries live in a size-limited LRU ``diskcache.Cache`` and
+    are written by a background thread so a slot never waits on disk.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        capacity_bytes: int = 4 << 30,
+        block_size: int = 64,
+        namespace: str = "",
+    ):
+        super().__init__(capacity_bytes)
+        self.block_size = block_size
+        self.namespace = namespace.encode("utf-8")
+        self.cache = diskcache.Cache(
+            cache_dir,
+            size_limit=capacity_bytes,
+            eviction_policy="least-recently-used",
+        )
+        self._local = threading.local()
+        self._pending: queue.Queue = queue.Queue(maxsize=2)
+        self._writer = threading.Thread(
+            target=self._write_loop, name="kv-state-writer", daemon=True
+        )
+        self._writer.start()
+
+    @property
+    def cache_size(self) -> int:
+        return int(self.cache.volume())
+
+    def _block_digests(self, tokens: Sequence[int]) -> Iterator[tuple[int, str]]:
+        data = np.asarray(tokens, dtype=np.int32)
+        digest = hashlib.blake2b(self.namespace, digest_size=16)
+        for end in range(self.block_size, len(data) + 1, self.block_size):
+            digest.update(data[end - self.block_size : end].tobytes())
+            yield end, digest.hexdigest()
+
+    def _lookup(self, tokens: Sequence[int]) -> LlamaState | None:
+        for _, digest in reversed(list(self._block_digests(tokens))):
+            state = self.cache.get(digest)
+            if state is not None:
+                return state
+        return None
+
+    def __getitem__(self, key: Sequence[int]) -> LlamaState:
+        # Llama looks up the prompt right before storing prompt + completion;
+        # remembering its length keys the stored state on the prompt part,
+        # which re-renders identically on the next turn
+        self._local.prompt_len = len(key)
+        state = self._lookup(key)
+        if state is None:
+            raise KeyError("No cached state for prompt prefix")
+        return state
+
+    def __contains__(self, key: Sequence[int]) -> bool:
+        return self._lookup(key) is not None
+
+    def __setitem__(self, key: Sequence[int], value: LlamaState) -> None:
+        prompt_len = min(getattr(self._local, "prompt_len", len(key)), len(key))
+        digest = None
+        for _, block_digest in self._block_digests(key[:prompt_len]):
+            digest = block_digest
+        if digest is None:
+            return
+
+        try:
+            self._pending.put_nowait((digest, compact_state(value)))
+        except queue.Full:
+            pass  # previous states are still being written; this one is optional
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            digest, state = item
+            self.cache.set(digest, state)
+
+    def close(self) -> None:
+        self._pending.put(None)
+        self._writer.join()
+        self.cache.close()
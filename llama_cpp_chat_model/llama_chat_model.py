@@ -4,25 +4,36 @@ from langchain_openai.chat_models.base import BaseChatOpenAI
 
 from llama_cpp_chat_model.llama_client import LLamaOpenAIClient
 from llama_cpp_chat_model.llama_client_async import LLamaOpenAIClientAsync
+from llama_cpp_chat_model.registry import ModelRegistry
+from llama_cpp_chat_model.scheduler import LlamaScheduler
 
 
 class LlamaChatModel(BaseChatOpenAI):
     model_name: str = "unknown"
-    llama: Llama = None
+    scheduler: LlamaScheduler | ModelRegistry = None
 
     def __init__(
         self,
-        llama: Llama,
+        llama: Llama | None = None,
+        scheduler: LlamaScheduler | ModelRegistry | None = None,
         **kwargs,
     ):
+        if scheduler is None:
+            if llama is None:
+                raise ValueError("Either llama or scheduler must be provided")
+            scheduler = LlamaScheduler(slots=[llama])
+        if isinstance(scheduler, ModelRegistry):
+            # Sent as the ``model`` kwarg, which the registry routes on
+            kwargs.setdefault("model_name", scheduler.default)
+
         super().__init__(
             **kwargs,
-            client=LLamaOpenAIClient(llama=llama),
-            async_client=LLamaOpenAIClientAsync(llama=llama),
+            client=LLamaOpenAIClient(scheduler=scheduler),
+            async_client=LLamaOpenAIClientAsync(scheduler=scheduler),
         )
-        self.llama = llama
+        self.scheduler = scheduler
 
     @property
     def _llm_type(self) -> str:
         """Return type of chat model"""
-        return self.llama.model_path
+        return self.scheduler.model_path
@@ -1,36 +1,38 @@
-from llama_cpp import Llama
+from llama_cpp_chat_model.scheduler import GenerationRequest, LlamaScheduler
 
 
 class LlamaCreateContextManager:
-    def __init__(self, llama: Llama, **kwargs):
-        self.llama = llama
+    def __init__(self, scheduler: LlamaScheduler, **kwargs):
+        self.scheduler = scheduler
         self.kwargs = kwargs
-        self.response = None
+        self.request: GenerationRequest | None = None
 
     def __call__(self):
         self.kwargs.pop("n", None)
-        self.kwargs.pop(
-            "parallel_tool_calls", None
-        )  # LLamaCPP does not support parallel tool calls
+        # Not a llama.cpp parameter; chatml-function-calling already emits
+        # several tool calls per turn when the model asks for them
+        self.kwargs.pop("parallel_tool_calls", None)
 
-        self.response = self.llama.create_chat_completion(**self.kwargs)
-        return self.response
+        self.request = self.scheduler.submit(self.kwargs)
+        if self.request.stream:
+            return iter(self.request)
+        return self.request.result()
 
     def __enter__(self):
         return self()
 
     def __exit__(self, exception_type, exception_value, exception_traceback):
-        if hasattr(self.response, "close"):
-            self.response.close()
+        if self.request is not None:
+            self.request.cancel()
         return False
 
 
 class LLamaOpenAIClient:
-    def __init__(self, llama: Llama):
-        self.llama = llama
+    def __init__(self, scheduler: LlamaScheduler):
+        self.scheduler = scheduler
 
     def create(self, **kwargs):
-        proxy = LlamaCreateContextManager(llama=self.llama, **kwargs)
+        proxy = LlamaCreateContextManager(scheduler=self.scheduler, **kwargs)
         if "stream" in kwargs and kwargs["stream"] is True:
             return proxy
         else:
@@ -1,4 +1,4 @@
-from llama_cpp import Llama
+from llama_cpp_chat_model.scheduler import AsyncGenerationRequest, LlamaScheduler
 
 
 async def to_async_iterator(iterator):
@@ -7,46 +7,50 @@ async def to_async_iterator(iterator):
 
 
 class LlamaCreateAsyncContextManager:
+    """Runs the completion on a scheduler slot and awaits its chunks.
 
-    def __init__(self, llama: Llama, **kwargs):
-        self.llama = llama
+    Generation never touches the event loop: chunks arrive through the bounded
+    asyncio queue of an ``AsyncGenerationRequest``.
+    """
+
+    def __init__(self, scheduler: LlamaScheduler, **kwargs):
+        self.scheduler = scheduler
         self.kwargs = kwargs
-        self.response = None
+        self.request: AsyncGenerationRequest | None = None
 
     def __aiter__(self):
         return self
 
     async def __anext__(self):
-        try:
-            return next(self.response)
-        except Exception:
-            raise StopAsyncIteration()
+        return await self.request.__anext__()
 
-    def __call__(self):
+    async def __call__(self):
         self.kwargs.pop("n", None)
-        self.kwargs.pop(
-            "parallel_tool_calls", None
-        )  # LLamaCPP does not support parallel tool calls
+        # Not a llama.cpp parameter; chatml-function-calling already emits
+        # several tool calls per turn when the model asks for them
+        self.kwargs.pop("parallel_tool_calls", None)
 
-        self.response = self.llama.create_chat_completion(**self.kwargs)
-        return self.response
+        self.request = self.scheduler.submit_async(self.kwargs)
+        if self.request.stream:
+            return self
+        return await self.request.aresult()
 
     async def __aenter__(self):
-        return self()
+        return await self()
 
     async def __aexit__(self, exception_type, exception_value, exception_traceback):
-        if hasattr(self.response, "close"):
-            self.response.close()
+        if self.request is not None:
+            self.request.cancel()
         return False
 
 
 class LLamaOpenAIClientAsync:
-    def __init__(self, llama: Llama):
-        self.llama = llama
+    def __init__(self, scheduler: LlamaScheduler):
+        self.scheduler = scheduler
 
     async def create(self, **kwargs):
-        proxy = LlamaCreateAsyncContextManager(llama=self.llama, **kwargs)
+        proxy = LlamaCreateAsyncContextManager(scheduler=self.scheduler, **kwargs)
         if "stream" in kwargs and kwargs["stream"] is True:
             return proxy
         else:
-            return proxy()
+            return await proxy()
@@ -0,0 +1,158 @@
+import hashlib
+from threading import Lock
+
+import numpy as np
+from llama_cpp import Llama, LlamaState, llama_chat_format
+
+# Continuations of the prefix that start differently; a token that merges the
+# end of the prefix with what follows is left out of the shared tokens
+PROBE_SUFFIXES = ("\n", " ", "0")
+
+# model path -> (prefix digest, tokens); one entry per loaded tokenizer
+_prefix_tokens: dict[str, tuple[str, list[int]]] = {}
+_prefix_tokens_lock = Lock()
+
+
+class _PromptBuilt(Exception):
+    def __init__(self, tokens: list[int]):
+        super().__init__()
+        self.tokens = tokens
+
+
+class _PromptRecorder:
+    """Stands in for Llama in a chat handler and stops at the finished prompt."""
+
+    def __init__(self, llama: Llama):
+        self._llama = llama
+
+    def __getattr__(self, name: str):
+        return getattr(self._llama, name)
+
+    def create_completion(self, prompt, **kwargs):
+        if isinstance(prompt, str):
+            # As Llama.create_completion tokenizes a text prompt
+            prompt = self._llama.tokenize(prompt.encode("utf-8"), special=True)
+        raise _PromptBuilt(list(prompt))
+
+
+def render_prompt(llama: Llama, messages: list[dict]) -> list[int]:
+    """Tokens of the prompt ``llama``'s chat handler builds for ``messages``.
+
+    The handler is looked up as ``Llama.create_chat_completion`` does, so
+    templating details such as HTML escaping are the same; nothing is evaluated.
+    """
+    handler = (
+        llama.chat_handler
+        or llama._chat_handlers.get(llama.chat_format)
+        or llama_chat_format.get_chat_completion_handler(llama.chat_format)
+    )
+    try:
+        handler(llama=_PromptRecorder(llama), messages=messages)
+    except _PromptBuilt as built:
+        return built.tokens
+    raise RuntimeError(f"Chat format {llama.chat_format} built no prompt")
+
+
+def common_prefix_length(a: np.ndarray, b: np.ndarray) -> int:
+    n = min(len(a), len(b))
+    mismatches = np.flatnonzero(a[:n] != b[:n])
+    return int(mismatches[0]) if mismatches.size else n
+
+
+def tokenize_prefix(llama: Llama, content: str) -> list[int]:
+    """Tokens every prompt whose user message starts with ``content`` starts with.
+
+    Rendered through the model's chat handler, once per model; a different
+    content for the same model, e.g. after the tool set changed, replaces the
+    memoized tokens.
+    """
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    with _prefix_tokens_lock:
+        cached = _prefix_tokens.get(llama.model_path)
+        if cached is not None and cached[0] == digest:
+            return cached[1]
+
+    renders = [
+        np.array(
+            render_prompt(llama, [{"role": "user", "content": content + suffix}]),
+            dtype=np.intc,
+        )
+        for suffix in PROBE_SUFFIXES
+    ]
+    n = min(common_prefix_length(renders[0], render) for render in renders[1:])
+    tokens = renders[0][:n].tolist()
+    with _prefix_tokens_lock:
+        _prefix_tokens[llama.model_path] = (digest, tokens)
+    return tokens
+
+
+def compact_state(state: LlamaState) -> LlamaState:
+    """Drops the per-token logits rows that ``load_state`` never reads back.
+
+    Generation always re-evaluates the last prompt token after a restore, so one
+    row is enough; ``load_state`` broadcasts it over the restored range.
+    """
+    if state.scores.shape[0] <= 1:
+        return state
+    return LlamaState(
+        input_ids=state.input_ids,
+        scores=state.scores[-1:].copy(),
+        n_tokens=state.n_tokens,
+        llama_state=state.llama_state,
+        llama_state_size=state.llama_state_size,
+        seed=state.seed,
+    )
+
+
+class PrefixCache:
+    """Keeps the evaluated KV state of a prompt prefix shared by every request.
+
+    The prefix is the rendered start of a prompt whose user message begins with
+    ``content``. ``restore`` loads its state into a slot whose context shares
+    less of the prefix; Llama's own prefix matching then only evaluates the
+    suffix. A cache that was never warmed is evaluated by the first slot that
+    restores it.
+    """
+
+    def __init__(self, content: str):
+        self.content = content
+        self.tokens: list[int] = []
+        self.state: LlamaState | None = None
+        self._tokens_array = np.array([], dtype=np.intc)
+        self._lock = Lock()
+
+    @property
+    def n_tokens(self) -> int:
+        return len(self.tokens)
+
+    def tokenize(self, llama: Llama) -> list[int]:
+        """Tokenizes the prefix without touching the slot's context."""
+        if not self.tokens:
+            self.tokens = tokenize_prefix(llama, self.content)
+            self._tokens_array = np.array(self.tokens, dtype=np.intc)
+        return self.tokens
+
+    def warm(self, llama: Llama) -> None:
+        with self._lock:
+            self._warm(llama)
+
+    def _warm(self, llama: Llama) -> None:
+        llama.reset()
+        llama.eval(self.tokenize(llama))
+        self.state = compact_state(llama.save_state())
+
+    def restore(self, llama: Llama) -> bool:
+        if self.state is None:
+            with self._lock:
+                if self.state is None:
+                    self._warm(llama)
+                    return True
+        # Llama reuses what the slot already shares with the prompt by itself;
+        # the saved state only helps when it covers more of it
+        n_shared = common_prefix_length(
+            llama.input_ids[: llama.n_tokens], self._tokens_array
+        )
+        if n_shared >= self.n_tokens:
+            return False
+        llama.load_state(self.state)
+        return True
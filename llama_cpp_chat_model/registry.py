@@ -0,0 +1,136 @@
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable
+
+from llama_cpp_chat_model.scheduler import (
+    AsyncGenerationRequest,
+    GenerationRequest,
+    LlamaScheduler,
+)
+
+
+class ModelRegistry:
+    """Named GGUF models behind one scheduler-like interface.
+
+    A completion picks its model with the ``model`` kwarg. Models are loaded on
+    first use and, once the GGUF files of the loaded models add up to more than
+    ``ram_budget_bytes``, idle ones are unloaded least recently used first.
+    Pinned models are never unloaded. Weights are mmap'd, so an unloaded model
+    usually still sits in the page cache and reloads without reading the disk.
+    """
+
+    def __init__(
+        self,
+        model_paths: dict[str, str],
+        load: Callable[[str], LlamaScheduler],
+        unload: Callable[[str, LlamaScheduler], None] | None = None,
+        default: str = "default",
+        ram_budget_bytes: int = 0,
+        pinned: tuple[str, ...] = (),
+    ):
+        if default not in model_paths:
+            raise ValueError(f"Default model {default!r} is not registered")
+
+        self.model_paths = model_paths
+        self.default = default
+        self.ram_budget_bytes = ram_budget_bytes
+        self.pinned = set(pinned)
+        self._load = load
+        self._unload = unload
+        self._loaded: OrderedDict[str, LlamaScheduler] = OrderedDict()
+        self._load_locks = {name: Lock() for name in model_paths}
+        self._lock = Lock()
+
+    @property
+    def model_path(self) -> str:
+        return self.model_paths[self.default]
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(scheduler.queue_depth for scheduler in self.loaded().values())
+
+    @property
+    def active(self) -> int:
+        return sum(scheduler.active for scheduler in self.loaded().values())
+
+    @property
+    def n_slots(self) -> int:
+        return sum(len(scheduler.slots) for scheduler in self.loaded().values())
+
+    def loaded(self) -> dict[str, LlamaScheduler]:
+        with self._lock:
+            return dict(self._loaded)
+
+    def model_bytes(self, name: str) -> int:
+        try:
+            return os.path.getsize(self.model_paths[name])
+        except OSError:
+            return 0
+
+    def get(self, name: str | None = None) -> LlamaScheduler:
+        return self._with_scheduler(name, lambda scheduler: scheduler)
+
+    def submit(self, kwargs: dict) -> GenerationRequest:
+        return self._with_scheduler(
+            kwargs.get("model"), lambda scheduler: scheduler.submit(kwargs)
+        )
+
+    def submit_async(self, kwargs: dict) -> AsyncGenerationRequest:
+        return self._with_scheduler(
+            kwargs.get("model"), lambda scheduler: scheduler.submit_async(kwargs)
+        )
+
+    def _with_scheduler(self, name: str | None, use: Callable):
+        name = name or self.default
+        if name not in self.model_paths:
+            raise ValueError(f"Unknown model {name!r}")
+
+        while True:
+            # Submitting under the lock keeps eviction from picking this model
+            # between the lookup and the enqueue
+            with self._lock:
+                scheduler = self._loaded.get(name)
+                if scheduler is not None:
+                    self._loaded.move_to_end(name)
+                    return use(scheduler)
+            self._load_model(name)
+
+    def _load_model(self, name: str) -> None:
+        with self._load_locks[name]:
+            if name in self._loaded:
+                return
+            self._evict(self.model_bytes(name))
+            scheduler = self._load(name)
+            with self._lock:
+                self._loaded[name] = scheduler
+
+    def _evict(self, needed_bytes: int) -> None:
+        if not self.ram_budget_bytes:
+            return
+
+        victims = []
+        with self._lock:
+            used = sum(self.model_bytes(name) for name in self._loaded)
+            for name, scheduler in list(self._loaded.items()):
+                if used + needed_bytes <= self.ram_budget_bytes:
+                    break
+                if name in self.pinned or scheduler.active or scheduler.queue_depth:
+                    continue
+                del self._loaded[name]
+                used -= self.model_bytes(name)
+                victims.append((name, scheduler))
+
+        for name, scheduler in victims:
+            scheduler.close()
+            if self._unload is not None:
+                self._unload(name, scheduler)
+
+    def close(self) -> None:
+        with self._lock:
+            loaded = list(self._loaded.items())
+            self._loaded.clear()
+        for name, scheduler in loaded:
+            scheduler.close()
+            if self._unload is not None:
+                self._unload(name, scheduler)
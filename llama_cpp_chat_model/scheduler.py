@@ -0,0 +1,283 @@
+import asyncio
+import queue
+import time
+from concurrent.futures import CancelledError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Iterator
+
+from llama_cpp import Llama
+
+from llama_cpp_chat_model.prefix_cache import PrefixCache
+from utils.logger import CustomLogger
+
+logger = CustomLogger(__name__)
+
+_DONE = object()
+
+
+class GenerationRequest:
+    """A queued chat completion whose results are handed back by a slot worker."""
+
+    def __init__(self, kwargs: dict, max_buffered_chunks: int = 64):
+        self.kwargs = kwargs
+        self.stream = bool(kwargs.get("stream"))
+        self.enqueued_at = time.perf_counter()
+        # Filled in by the slot worker, read by the scheduler's on_finished hook
+        self.started_at: float | None = None
+        self.first_chunk_at: float | None = None
+        self.finished_at: float | None = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._cancelled = Event()
+        self._results: queue.Queue = queue.Queue(maxsize=max_buffered_chunks)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def put(self, item: Any) -> bool:
+        """Hands an item to the consumer, blocking while it is behind.
+
+        Returns False once the consumer has gone away so the slot can move on.
+        """
+        while not self.cancelled:
+            try:
+                self._results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def finish(self, error: BaseException | None = None) -> None:
+        if error is not None:
+            self.put(error)
+        self.put(_DONE)
+
+    def __iter__(self) -> Iterator[dict]:
+        try:
+            while True:
+                item = self._results.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self.cancel()
+
+    def result(self) -> dict:
+        for item in self:
+            return item
+        raise RuntimeError("Generation finished without a response")
+
+
+class AsyncGenerationRequest(GenerationRequest):
+    """Hands chunks back to an event loop through a bounded asyncio queue.
+
+    The slot worker waits on the loop for free space, so a slow websocket applies
+    backpressure to generation without ever blocking the loop itself.
+    """
+
+    def __init__(
+        self,
+        kwargs: dict,
+        loop: asyncio.AbstractEventLoop,
+        max_buffered_chunks: int = 64,
+    ):
+        super().__init__(kwargs, max_buffered_chunks=max_buffered_chunks)
+        self._loop = loop
+        self._async_results: asyncio.Queue = asyncio.Queue(
+            maxsize=max_buffered_chunks
+        )
+
+    def put(self, item: Any) -> bool:
+        if self.cancelled:
+            return False
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                self._async_results.put(item), self._loop
+            )
+        except RuntimeError:  # event loop already closed
+            return False
+
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return True
+            except FutureTimeoutError:
+                if self.cancelled:
+                    future.cancel()
+                    return False
+            except CancelledError:
+                return False
+
+    def __iter__(self):
+        raise TypeError("AsyncGenerationRequest must be consumed with 'async for'")
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        item = await self._async_results.get()
+        if item is _DONE:
+            self.cancel()
+            raise StopAsyncIteration
+        if isinstance(item, BaseException):
+            self.cancel()
+            raise item
+        return item
+
+    async def aresult(self) -> dict:
+        try:
+            return await self.__anext__()
+        except StopAsyncIteration:
+            raise RuntimeError("Generation finished without a response") from None
+        finally:
+            self.cancel()
+
+
+class LlamaScheduler:
+    """Queues chat completions in front of one or more Llama contexts (slots).
+
+    llama-cpp-python keeps a single KV cache per ``Llama`` object, so a slot serves
+    one sequence at a time. Concurrency comes from running several slots that share
+    the same mmap'd weights, each drained by its own worker thread. ``on_finished``
+    is called with every request a slot has completed, for metrics.
+    """
+
+    def __init__(
+        self,
+        slots: list[Llama],
+        max_queue_size: int = 64,
+        max_buffered_chunks: int = 64,
+        prefix_cache: PrefixCache | None = None,
+        on_finished: Callable[[GenerationRequest], None] | None = None,
+    ):
+        if not slots:
+            raise ValueError("Scheduler needs at least one Llama slot")
+
+        self.slots = slots
+        self.max_buffered_chunks = max_buffered_chunks
+        self.prefix_cache = prefix_cache
+        self.on_finished = on_finished
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._active = 0
+        self._active_lock = Lock()
+        self._workers = [
+            Thread(
+                target=self._run_slot,
+                args=(llama,),
+                name=f"llama-slot-{index}",
+                daemon=True,
+            )
+            for index, llama in enumerate(slots)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def model_path(self) -> str:
+        return self.slots[0].model_path
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def submit(self, kwargs: dict) -> GenerationRequest:
+        request = GenerationRequest(
+            kwargs, max_buffered_chunks=self.max_buffered_chunks
+        )
+        self._enqueue(request)
+        return request
+
+    def submit_async(self, kwargs: dict) -> AsyncGenerationRequest:
+        """Same as ``submit`` but results are delivered to the running event loop."""
+        request = AsyncGenerationRequest(
+            kwargs,
+            loop=asyncio.get_running_loop(),
+            max_buffered_chunks=self.max_buffered_chunks,
+        )
+        self._enqueue(request)
+        return request
+
+    def _enqueue(self, request: GenerationRequest) -> None:
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            raise RuntimeError("Inference queue is full, try again later") from None
+
+    def _run_slot(self, llama: Llama) -> None:
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            if request.cancelled:
+                continue
+
+            with self._active_lock:
+                self._active += 1
+            request.started_at = time.perf_counter()
+            try:
+                if self.prefix_cache is not None:
+                    self.prefix_cache.restore(llama)
+                self._generate(llama, request)
+                request.finished_at = time.perf_counter()
+                request.finish()
+            except Exception as e:
+                request.finish(error=e)
+            finally:
+                with self._active_lock:
+                    self._active -= 1
+            if request.finished_at is not None and self.on_finished is not None:
+                try:
+                    self.on_finished(request)
+                except Exception:
+                    # A failing hook must not take the slot down with it
+                    logger.exception("on_finished hook failed")
+
+    @staticmethod
+    def _generate(llama: Llama, request: GenerationRequest) -> None:
+        response = llama.create_chat_completion(**request.kwargs)
+        if not request.stream:
+            request.first_chunk_at = time.perf_counter()
+            usage = response.get("usage") or {}
+            request.prompt_tokens = usage.get("prompt_tokens", 0)
+            request.completion_tokens = usage.get("completion_tokens", 0)
+            request.put(response)
+            return
+
+        try:
+            for chunk in response:
+                if request.first_chunk_at is None:
+                    request.first_chunk_at = time.perf_counter()
+                delta = chunk["choices"][0].get("delta", {}) if chunk["choices"] else {}
+                if delta.get("content") or delta.get("tool_calls"):
+                    request.completion_tokens += 1
+                if not request.put(chunk):
+                    break
+        finally:
+            response.close()
+        # Streamed chunks carry no usage; the context now holds prompt + completion
+        request.prompt_tokens = max(llama.n_tokens - request.completion_tokens, 0)
+
+    def close(self) -> None:
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.finish(error=RuntimeError("Scheduler is shutting down"))
+
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
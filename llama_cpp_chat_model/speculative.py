@@ -0,0 +1,132 @@
+from typing import Any, Callable
+
+import numpy as np
+import numpy.typing as npt
+from llama_cpp import Llama
+from llama_cpp.llama_speculative import LlamaDraftModel, LlamaPromptLookupDecoding
+
+DRAFT_STRATEGIES = ("prompt_lookup", "draft_model")
+
+
+class LlamaModelDraft(LlamaDraftModel):
+    """Greedy drafts from a smaller GGUF that shares the main model's vocabulary.
+
+    The draft context keeps what it has already evaluated, so each call only
+    evaluates the tokens accepted since the previous draft.
+    """
+
+    def __init__(self, llama: Llama, num_pred_tokens: int = 10):
+        self.llama = llama
+        self.num_pred_tokens = num_pred_tokens
+
+    def __call__(
+        self, input_ids: npt.NDArray[np.intc], /, **kwargs: Any
+    ) -> npt.NDArray[np.intc]:
+        draft = self.llama
+        n_pred = min(self.num_pred_tokens, draft.n_ctx() - len(input_ids))
+        if n_pred <= 0:
+            return np.array([], dtype=np.intc)
+
+        # Keep at least the last token to evaluate, its logits give the first draft
+        limit = min(draft.n_tokens, len(input_ids) - 1)
+        mismatch = np.nonzero(draft.input_ids[:limit] != input_ids[:limit])[0]
+        draft.n_tokens = int(mismatch[0]) if len(mismatch) else limit
+        draft.eval(input_ids[draft.n_tokens :].tolist())
+
+        tokens = []
+        for _ in range(n_pred):
+            token = draft.sample(temp=0.0)
+            if token == draft.token_eos():
+                break
+            tokens.append(token)
+            if len(tokens) < n_pred:
+                draft.eval([token])
+        return np.array(tokens, dtype=np.intc)
+
+
+class MeteredDraftModel(LlamaDraftModel):
+    """Counts drafted tokens and how many of them the main model accepted.
+
+    Llama calls the draft model again right after verifying the previous draft,
+    so the accepted part is the longest prefix of that draft found in the new
+    ``input_ids``. A call that does not continue the drafted context belongs to
+    a new generation and leaves the previous draft uncounted.
+    ``on_verified(proposed, accepted)`` is called once per counted draft.
+    """
+
+    def __init__(
+        self,
+        draft_model: LlamaDraftModel,
+        on_verified: Callable[[int, int], None] | None = None,
+    ):
+        self.draft_model = draft_model
+        self.on_verified = on_verified
+        self.proposed = 0
+        self.accepted = 0
+        self._last_draft = np.array([], dtype=np.intc)
+        self._context = np.array([], dtype=np.intc)  # what the last draft continues
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.proposed if self.proposed else 0.0
+
+    def __call__(
+        self, input_ids: npt.NDArray[np.intc], /, **kwargs: Any
+    ) -> npt.NDArray[np.intc]:
+        self._verify(input_ids)
+        draft = self.draft_model(input_ids, **kwargs)
+        # Copies: prompt lookup returns a view into input_ids, which Llama overwrites
+        self._last_draft = np.array(draft, dtype=np.intc)
+        self._context = np.array(input_ids, dtype=np.intc)
+        return draft
+
+    def _verify(self, input_ids: npt.NDArray[np.intc]) -> None:
+        proposed = len(self._last_draft)
+        if not proposed:
+            return
+        self._last_draft, draft = self._last_draft[:0], self._last_draft
+        start = len(self._context)
+        if len(input_ids) <= start or not np.array_equal(
+            input_ids[:start], self._context
+        ):
+            return
+        verified = input_ids[start : start + proposed]
+        matches = verified == draft[: len(verified)]
+        accepted = len(verified) if matches.all() else int(np.argmin(matches))
+
+        self.proposed += proposed
+        self.accepted += accepted
+        if self.on_verified is not None:
+            self.on_verified(proposed, accepted)
+
+
+def build_draft_model(
+    strategy: str | None = None,
+    num_pred_tokens: int = 10,
+    max_ngram_size: int = 2,
+    model_path: str | None = None,
+    llama_params: dict | None = None,
+    on_verified: Callable[[int, int], None] | None = None,
+) -> LlamaDraftModel | None:
+    """Creates the draft model for one Llama context, or None when disabled."""
+    if not strategy:
+        return None
+    if strategy == "prompt_lookup":
+        draft_model = LlamaPromptLookupDecoding(
+            max_ngram_size=max_ngram_size, num_pred_tokens=num_pred_tokens
+        )
+    elif strategy == "draft_model":
+        if not model_path:
+            raise ValueError("The draft_model strategy needs a draft model path")
+        params = {
+            key: value
+            for key, value in (llama_params or {}).items()
+            if key != "chat_format"
+        }
+        params.update(model_path=model_path, verbose=False)
+        draft_model = LlamaModelDraft(Llama(**params), num_pred_tokens)
+    else:
+        raise ValueError(
+            f"Unknown draft strategy {strategy!r}, expected one of {DRAFT_STRATEGIES}"
+        )
+    return MeteredDraftModel(draft_model, on_verified=on_verified)
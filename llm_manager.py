@@ -1,31 +1,68 @@
 import uuid
-from typing import Annotated, Sequence, TypedDict
+from typing import Annotated, Callable, Sequence, TypedDict
 
 from langgraph.constants import END
+from llama_cpp_chat_model.kv_cache import KVStateStore
 from llama_cpp_chat_model.llama_chat_model import LlamaChatModel
+from llama_cpp_chat_model.prefix_cache import PrefixCache
+from llama_cpp_chat_model.registry import ModelRegistry
+from llama_cpp_chat_model.scheduler import LlamaScheduler
+from llama_cpp_chat_model.speculative import build_draft_model
 import importlib
 import inspect
 import os
 from langchain_core.messages import (
     BaseMessage,
     AIMessage,
+    AIMessageChunk,
     SystemMessage,
     ToolMessage,
     HumanMessage,
+    convert_to_messages,
 )
-from langchain_core.runnables import RunnableConfig
-from langchain_core.tools.simple import Tool
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.tools import BaseTool
 from langgraph.graph import add_messages, StateGraph
 from llama_cpp import Llama
-from utils.config import ModelSettings
+from utils.checkpointer import BoundedMemorySaver
+from utils.response_cache import ResponseCache
+from utils.config import (
+    ModelSettings,
+    RegistrySettings,
+    ResponseCacheSettings,
+    SchedulerSettings,
+    SessionSettings,
+    ToolSettings,
+    TracingSettings,
+)
+from utils.tracing import (
+    TracingCallbackHandler,
+    configure_tracing,
+    shutdown_tracing,
+)
+from utils.metrics import (
+    ACTIVE_SESSIONS,
+    ACTIVE_SLOTS,
+    PROMPT_PREFIX_TOKENS,
+    QUEUE_DEPTH,
+    RESPONSE_CACHE_REQUESTS,
+    SPECULATIVE_ACCEPTED_TOKENS,
+    SPECULATIVE_DRAFT_TOKENS,
+    ToolMetricsHandler,
+    observe_generation,
+)
 from threading import Lock
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import ToolNode
+from utils.tool_executor import ConcurrentToolNode
 
 from utils.logger import CustomLogger
 
 logger = CustomLogger(__name__)
 
+# Per-token deltas from the chat model plus node updates for tool call events
+STREAM_MODES = ["messages", "updates"]
+# Sampling for the turns that may call tools, which should pick them reliably
+TOOL_CALL_PARAMS = {"temperature": 0.0}
+
 
 class SingletonMeta(type):
     _instances = {}
@@ -44,45 +81,217 @@ class SingletonMeta(type):
 
 
 class LLMEngine(metaclass=SingletonMeta):
-    def __init__(self, **model_kwargs):
+    def __init__(
+        self,
+        system_prefix: str | None = None,
+        tools: list[BaseTool] | None = None,
+        **model_kwargs,
+    ):
+        self._system_prefix = system_prefix
+        self._tools = tools
+        self._agent = None
         self._model = None
         self._model_lock = Lock()
         self._warmup_done = False
         self._model_kwargs = model_kwargs
+        self._response_cache = self._build_response_cache()
+
+    @staticmethod
+    def _build_response_cache() -> ResponseCache | None:
+        settings = ResponseCacheSettings()
+        if not settings.response_cache_enabled:
+            return None
+        logger.info(f"Caching final answers in {settings.response_cache_dir}")
+        return ResponseCache(
+            settings.response_cache_dir,
+            ttl_seconds=settings.response_cache_ttl_seconds,
+            size_limit_bytes=settings.response_cache_size_mb * 1024 * 1024,
+            bypass_tools=settings.response_cache_bypass_tools,
+        )
 
     def _load_model(self):
         with self._model_lock:
             if self._model is None:
                 logger.info("Loading LLM model...")
-                base_settings = ModelSettings().model_dump()
-                self._model = LangGraphAgent(
-                    internal_params=base_settings, **self._model_kwargs
-                )().with_config(
-                    config=RunnableConfig(
-                        configurable={
-                            "thread_id": str(uuid.uuid4()),
-                            "recursion_limit": 50,
-                        }
-                    )
+                registry = RegistrySettings()
+                models = {registry.default_model: ModelSettings()}
+                for name, overrides in registry.models.items():
+                    models[name] = ModelSettings(**overrides)
+                self._agent = LangGraphAgent(
+                    system_prefix=self._system_prefix,
+                    tools=self._tools,
+                    models=models,
+                    default_model=registry.default_model,
+                    tool_model=registry.tool_model,
+                    answer_model=registry.answer_model,
+                    ram_budget_bytes=registry.model_ram_budget_mb * 1024 * 1024,
+                    **self._model_kwargs,
                 )
+                self._model = self._build_runnable()
                 logger.info("Model loaded successfully.")
 
-    def infer(self, inputs: list, stream: bool = False):
+    def _build_runnable(self):
+        callbacks = [ToolMetricsHandler([tool.name for tool in self._agent.tool_list])]
+        tracer = configure_tracing(TracingSettings().trace_path)
+        if tracer is not None:
+            callbacks.append(TracingCallbackHandler(tracer))
+        return self._agent().with_config(
+            config=RunnableConfig(recursion_limit=50, callbacks=callbacks)
+        )
+
+    @staticmethod
+    def _session_config(
+        session_id: str | None, model: str | None = None
+    ) -> RunnableConfig:
+        # Each session gets its own checkpointer thread; anonymous calls get a
+        # throwaway one that the checkpointer evicts once idle
+        configurable = {"thread_id": session_id or str(uuid.uuid4())}
+        if model:
+            configurable["model"] = model
+        return RunnableConfig(configurable=configurable)
+
+    def infer(
+        self,
+        inputs: list,
+        stream: bool = False,
+        stream_mode: str | list[str] | None = None,
+        session_id: str | None = None,
+        model: str | None = None,
+    ):
         if not inputs:
             raise ValueError("Messages list cannot be empty")
 
-        logger.info(f"Running inference with prompt: {inputs}")
+        logger.debug("Running inference with prompt: %s", inputs)
+        registry = self._agent.registry
+        self._agent.update_load_metrics()
+        logger.debug(
+            "Scheduler queue depth: %d, active slots: %d/%d",
+            registry.queue_depth,
+            registry.active,
+            registry.n_slots,
+        )
+
+        config = self._session_config(session_id, model)
+        if self._response_cache is not None:
+            return self._infer_cached(inputs, stream, stream_mode, config)
+        if stream:
+            return self._model.astream(
+                {"messages": inputs},
+                config=config,
+                stream_mode=stream_mode or STREAM_MODES,
+            )
+        else:
+            return self._model.invoke({"messages": inputs}, config=config)
+
+    def _infer_cached(
+        self,
+        inputs,
+        stream: bool,
+        stream_mode: str | list[str] | None,
+        config: RunnableConfig,
+    ):
+        app = self._agent.app
+        history = list(app.get_state(config).values.get("messages", []))
+        new_messages = convert_to_messages(
+            [inputs] if isinstance(inputs, str) else inputs
+        )
+        key = ResponseCache.key(
+            history + new_messages,
+            self._agent.generation_params(config["configurable"].get("model")),
+            self._system_prefix,
+        )
+
+        answer = self._response_cache.get(key)
+        if answer is not None:
+            RESPONSE_CACHE_REQUESTS.labels(result="hit").inc()
+            message = AIMessage(content=answer)
+            # The session still records the turn, as if the graph had run
+            app.update_state(
+                config, {"messages": [*new_messages, message]}, as_node="agent"
+            )
+            if stream:
+                return self._replay(message, stream_mode or STREAM_MODES)
+            return {"messages": [*history, *new_messages, message]}
 
         if stream:
-            return self._model.astream({"messages": inputs}, stream_mode="values")
+            return self._stream_and_cache(
+                new_messages, config, stream_mode or STREAM_MODES, key, len(history)
+            )
+        result = self._model.invoke({"messages": new_messages}, config=config)
+        self._store_answer(key, config, len(history))
+        return result
+
+    @staticmethod
+    async def _replay(message: AIMessage, stream_mode: str | list[str]):
+        """Streams a cached answer the way the graph streams a fresh one."""
+        events = {
+            "messages": (
+                AIMessageChunk(content=message.content),
+                {"langgraph_node": "agent"},
+            ),
+            "updates": {"agent": {"messages": [message]}},
+        }
+        if isinstance(stream_mode, str):
+            if stream_mode in events:
+                yield events[stream_mode]
+            return
+        for mode in stream_mode:
+            if mode in events:
+                yield mode, events[mode]
+
+    async def _stream_and_cache(
+        self,
+        new_messages: list[BaseMessage],
+        config: RunnableConfig,
+        stream_mode: str | list[str],
+        key: str,
+        n_history: int,
+    ):
+        async for item in self._model.astream(
+            {"messages": new_messages}, config=config, stream_mode=stream_mode
+        ):
+            yield item
+        # Only reached when the stream ran to the end
+        self._store_answer(key, config, n_history)
+
+    def _store_answer(self, key: str, config: RunnableConfig, n_history: int) -> None:
+        turn = self._agent.app.get_state(config).values.get("messages", [])[n_history:]
+        if self._response_cache.cacheable(turn):
+            self._response_cache.set(key, turn[-1].content)
+            RESPONSE_CACHE_REQUESTS.labels(result="miss").inc()
         else:
-            return self._model.invoke({"messages": inputs})
+            RESPONSE_CACHE_REQUESTS.labels(result="bypass").inc()
+
+    def refresh_tools(self) -> bool:
+        """Reloads the tools folder and applies a changed tool set to the agent.
+
+        The prompt is recompiled, the cached prefix replaced and the graph
+        rebuilt with the new tools; sessions are kept. Returns False when the
+        tool set is unchanged.
+        """
+        from prompts import prompt_prefix, prompt_tools, refresh_tools
+
+        refresh_tools()
+        system_prefix = prompt_prefix()
+        with self._model_lock:
+            if system_prefix == self._system_prefix:
+                return False
+            self._system_prefix = system_prefix
+            if self._agent is not None:
+                self._agent.set_tools(prompt_tools())
+                self._agent.set_system_prefix(system_prefix)
+                self._model = self._build_runnable()
+        logger.info("Tool set changed, agent rebuilt")
+        return True
 
     def warmup(self):
         try:
             self._load_model()
             logger.info("Warming up the model...")
-            self._model.invoke({"messages": [HumanMessage(content="Hello")]})
+            self._model.invoke(
+                {"messages": [HumanMessage(content="Hello")]},
+                config=self._session_config(None),
+            )
             self._warmup_done = True
             logger.info("Warmup complete.")
         except Exception as e:
@@ -92,11 +301,16 @@ class LLMEngine(metaclass=SingletonMeta):
         with self._model_lock:
             if self._model is not None:
                 try:
+                    self._agent.close()
+                    shutdown_tracing()
+                    if self._response_cache is not None:
+                        self._response_cache.close()
                     del self._model
                     logger.info("Model resources have been released.")
                 except Exception as e:
                     logger.error(f"Error cleaning up model resources: {e}")
                 finally:
+                    self._agent = None
                     self._model = None
                     self._warmup_done = False
 
@@ -115,28 +329,250 @@ class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
 
 
-class LangGraphAgent(metaclass=SingletonMeta):
-    def __init__(self, internal_params: dict | None = None, **model_kwargs):
-        if internal_params is None:
-            internal_params = {}
+def _observe_draft(proposed: int, accepted: int) -> None:
+    SPECULATIVE_DRAFT_TOKENS.inc(proposed)
+    SPECULATIVE_ACCEPTED_TOKENS.inc(accepted)
 
-        self.tool_list = load_tools_from_folder("./tools", package_prefix="tools")
-        logger.debug(f"Loaded tools: {[tool.name for tool in self.tool_list]}")
 
-        self.tool_node = ToolNode(self.tool_list, handle_tool_errors=True)
-        self.model = Llama(**internal_params)
-        self.chat_model = LlamaChatModel(llama=self.model)
+class LangGraphAgent(metaclass=SingletonMeta):
+    # Builds each Llama slot; swapped for a stub backend in benchmarks
+    llama_factory: Callable[..., Llama] = Llama
+
+    def __init__(
+        self,
+        internal_params: dict | None = None,
+        system_prefix: str | None = None,
+        tools: list[BaseTool] | None = None,
+        models: dict[str, ModelSettings] | None = None,
+        default_model: str = "default",
+        tool_model: str | None = None,
+        answer_model: str | None = None,
+        ram_budget_bytes: int = 0,
+        **model_kwargs,
+    ):
+        if models is None:
+            models = {default_model: ModelSettings(**(internal_params or {}))}
+
+        if tools is None:
+            tools = load_tools_from_folder("./tools", package_prefix="tools")
+        self.tool_list = tools
+        logger.debug(f"Loaded tools: {[tool.name for tool in self.tool_list]}")
+        self.tool_node = self._build_tool_node(self.tool_list)
+        self.models = models
+        self.system_prefix = system_prefix
+        self.tool_model = tool_model
+        self.answer_model = answer_model
+        self.model_kwargs = model_kwargs
+        self._kv_caches: dict[str, KVStateStore] = {}
+        self.registry = ModelRegistry(
+            model_paths={name: spec.model_path for name, spec in models.items()},
+            load=self._load_scheduler,
+            unload=self._unload_scheduler,
+            default=default_model,
+            ram_budget_bytes=ram_budget_bytes,
+            pinned=(default_model,),
+        )
+        # The default model is loaded up front and never unloaded
+        self.scheduler = self.registry.get()
+        self.model = self.scheduler.slots[0]
+        self.chat_model = LlamaChatModel(scheduler=self.registry)
 
-        self.llm_with_tools = self.chat_model.bind_tools(
-            tools=self.tool_list, tool_choice="auto"
-        ).with_config(config=RunnableConfig(configurable={"temperature": 0.0}))
+        self.llm_with_tools = self._bind_tools(self.tool_list)
 
         self.llm = self.chat_model.with_config(
             config=RunnableConfig(configurable={**model_kwargs})
         )
 
+        session_settings = SessionSettings()
+        self.checkpointer = BoundedMemorySaver(
+            max_threads=session_settings.max_sessions,
+            ttl_seconds=session_settings.session_ttl_seconds,
+            max_bytes=session_settings.session_memory_mb * 1024 * 1024,
+        )
         self.app = self._build_workflow()
 
+    @staticmethod
+    def _build_tool_node(tools: list[BaseTool]) -> ConcurrentToolNode:
+        tool_settings = ToolSettings()
+        return ConcurrentToolNode(
+            tools,
+            timeout=tool_settings.tool_timeout_seconds,
+            timeouts=tool_settings.tool_timeouts,
+            max_workers=tool_settings.tool_max_workers,
+            handle_tool_errors=True,
+        )
+
+    def _bind_tools(self, tools: list[BaseTool]):
+        return self.chat_model.bind_tools(tools=tools, tool_choice="auto").with_config(
+            config=RunnableConfig(configurable=TOOL_CALL_PARAMS)
+        )
+
+    def generation_params(self, model: str | None = None) -> dict:
+        """The model and sampling each agent node uses when ``model`` is requested.
+
+        Tool-calling turns and answers written from tool results may run on
+        different models with different params, so both are listed.
+        """
+        nodes = {
+            "tools": (self.tool_model, TOOL_CALL_PARAMS),
+            "answer": (self.answer_model, self.model_kwargs),
+        }
+        generation = {}
+        for node, (node_model, params) in nodes.items():
+            name = model or node_model or self.registry.default
+            settings = self.models.get(name)
+            generation[node] = {
+                "model": name,
+                "model_path": settings.model_path if settings else None,
+                "chat_format": settings.chat_format if settings else None,
+                "params": params,
+            }
+        return generation
+
+    def set_tools(self, tools: list[BaseTool]) -> None:
+        """Rebuilds the graph around ``tools``, keeping the checkpointed sessions.
+
+        Turns already running finish on the previous graph.
+        """
+        previous = self.tool_node
+        self.tool_list = tools
+        self.tool_node = self._build_tool_node(tools)
+        self.llm_with_tools = self._bind_tools(tools)
+        self.app = self._build_workflow()
+        previous.close(cancel_pending=False)
+
+    def _load_scheduler(self, name: str) -> LlamaScheduler:
+        settings = self.models[name]
+        logger.info(f"Loading model {name} from {settings.model_path}")
+        kv_cache = self._build_kv_cache(settings)
+        if kv_cache is not None:
+            self._kv_caches[name] = kv_cache
+        return self._build_scheduler(
+            settings.llama_params(),
+            self.system_prefix,
+            kv_cache,
+            settings.draft_params(),
+            on_finished=self._on_generation_finished,
+        )
+
+    def _on_generation_finished(self, request) -> None:
+        observe_generation(request)
+        self.update_load_metrics()
+
+    def update_load_metrics(self) -> None:
+        QUEUE_DEPTH.set(self.registry.queue_depth)
+        ACTIVE_SLOTS.set(self.registry.active)
+        ACTIVE_SESSIONS.set(self.checkpointer.thread_count)
+
+    def _unload_scheduler(self, name: str, scheduler: LlamaScheduler) -> None:
+        kv_cache = self._kv_caches.pop(name, None)
+        if kv_cache is not None:
+            kv_cache.close()
+        logger.info(f"Unloaded model {name}")
+
+    @staticmethod
+    def _build_kv_cache(settings: ModelSettings) -> KVStateStore | None:
+        if not settings.kv_cache_dir:
+            return None
+        logger.info(f"Using persistent KV state store at {settings.kv_cache_dir}")
+        return KVStateStore(
+            cache_dir=settings.kv_cache_dir,
+            capacity_bytes=settings.kv_cache_capacity_mb * 1024 * 1024,
+            block_size=settings.kv_cache_block_size,
+            namespace=f"{settings.model_path}:{settings.n_ctx}",
+        )
+
+    @staticmethod
+    def _build_scheduler(
+        internal_params: dict,
+        system_prefix: str | None = None,
+        kv_cache: KVStateStore | None = None,
+        draft_params: dict | None = None,
+        on_finished: Callable | None = None,
+    ) -> LlamaScheduler:
+        settings = SchedulerSettings()
+        params = dict(internal_params)
+        if settings.n_slots > 1 and "n_threads" in params:
+            params["n_threads"] = max(1, params["n_threads"] // settings.n_slots)
+
+        logger.info(
+            f"Creating {settings.n_slots} Llama slot(s) "
+            f"with {params.get('n_threads')} thread(s) each"
+        )
+        draft_params = draft_params or {}
+        speculative = bool(draft_params.get("strategy"))
+        if speculative:
+            logger.info(f"Speculative decoding with {draft_params['strategy']}")
+        # Draft models keep per-sequence state, so every slot gets its own
+        slots = [
+            LangGraphAgent.llama_factory(
+                **params,
+                # Drafts are verified against the logits of every position; only
+                # with logits_all does Llama keep room for more than n_batch
+                logits_all=speculative,
+                draft_model=build_draft_model(
+                    **draft_params,
+                    llama_params=params,
+                    on_verified=_observe_draft,
+                ),
+            )
+            for _ in range(settings.n_slots)
+        ]
+        if speculative:
+            scores_mb = slots[0].scores.nbytes // (1024 * 1024)
+            logger.warning(
+                f"Speculative decoding keeps logits for all {params.get('n_ctx')} "
+                f"context positions: {scores_mb} MB per slot"
+            )
+        if kv_cache is not None:
+            # Consulted by Llama before prompt evaluation, saved after completion
+            for llama in slots:
+                llama.set_cache(kv_cache)
+
+        prefix_cache = LangGraphAgent._build_prefix_cache(slots[0], system_prefix)
+        if prefix_cache is not None:
+            # Evaluated once; other slots get the saved KV state on first use
+            prefix_cache.warm(slots[0])
+
+        return LlamaScheduler(
+            slots=slots,
+            max_queue_size=settings.max_queue_size,
+            max_buffered_chunks=settings.max_buffered_chunks,
+            prefix_cache=prefix_cache,
+            on_finished=on_finished,
+        )
+
+    @staticmethod
+    def _build_prefix_cache(
+        llama: Llama, system_prefix: str | None
+    ) -> PrefixCache | None:
+        if not system_prefix:
+            return None
+        prefix_cache = PrefixCache(system_prefix)
+        try:
+            prefix_cache.tokenize(llama)
+        except Exception as e:
+            # e.g. a chat handler that needs more than messages to build a prompt
+            logger.warning(f"No prefix cache for {llama.chat_format}: {e}")
+            return None
+
+        PROMPT_PREFIX_TOKENS.labels(model=llama.model_path).set(
+            prefix_cache.n_tokens
+        )
+        logger.info(f"Caching KV state for {prefix_cache.n_tokens} prefix tokens")
+        return prefix_cache
+
+    def set_system_prefix(self, system_prefix: str | None) -> None:
+        """Swaps the cached prompt prefix, e.g. after the tool set changed.
+
+        The new prefix is evaluated by whichever slot serves the next request.
+        """
+        self.system_prefix = system_prefix
+        for scheduler in self.registry.loaded().values():
+            scheduler.prefix_cache = self._build_prefix_cache(
+                scheduler.slots[0], system_prefix
+            )
+
     def _build_workflow(self):
         def should_continue(state: AgentState):
             messages = state["messages"]
@@ -149,32 +585,56 @@ class LangGraphAgent(metaclass=SingletonMeta):
             else:
                 return "end"
 
-        def call_model(state: AgentState, config: RunnableConfig):
-            messages = state["messages"]
+        def prepare_call(messages: Sequence[BaseMessage], config: RunnableConfig):
+            llm, messages = select_llm(messages)
+            model = config.get("configurable", {}).get("model")
+            if model is None:
+                model = self.answer_model if llm is self.llm else self.tool_model
+            if model:
+                llm = llm.bind(model=model)
+            return llm, messages
 
+        def select_llm(messages: Sequence[BaseMessage]):
             if isinstance(messages[-1], ToolMessage):
+                # All results of the last turn's tool calls, which ran together
+                results = []
+                for message in reversed(messages):
+                    if not isinstance(message, ToolMessage):
+                        break
+                    results.append(f"{message.name}: {message.content}")
+                tool_responses = "\n".join(reversed(results))
                 sys = SystemMessage(
                     content=(
                         f"""
                         Respond naturally and informatively to the user based on the tool's response. 
                         Avoid mentioning tools, JSON, or technical details. 
                         Do not prefix responses with labels like 'AI:'.
-                        Tool responses {messages[-1].content}
+                        Tool responses {tool_responses}
                         """
                     )
                 )
+                return self.llm, list(messages) + [sys]
+            return self.llm_with_tools, messages
 
-                response = self.llm.invoke(messages + [sys], config)
-                if not isinstance(response, AIMessage):
-                    response = AIMessage(content=response.strip())
-            else:
-                response = self.llm_with_tools.invoke(input=messages, config=config)
-
+        def to_update(response) -> dict:
+            if not isinstance(response, AIMessage):
+                response = AIMessage(content=response.strip())
             return {"messages": [response]}
 
+        def call_model(state: AgentState, config: RunnableConfig):
+            llm, messages = prepare_call(state["messages"], config)
+            return to_update(llm.invoke(messages, config))
+
+        async def acall_model(state: AgentState, config: RunnableConfig):
+            # Awaited on the server loop; generation itself runs on a scheduler slot
+            llm, messages = prepare_call(state["messages"], config)
+            return to_update(await llm.ainvoke(messages, config))
+
         workflow = StateGraph(AgentState)
 
-        workflow.add_node("agent", call_model)
+        workflow.add_node(
+            "agent", RunnableLambda(call_model, afunc=acall_model, name="agent")
+        )
         workflow.add_node("tools", self.tool_node)
 
         workflow.set_entry_point("agent")
@@ -185,14 +645,26 @@ class LangGraphAgent(metaclass=SingletonMeta):
 
         workflow.add_edge("tools", "agent")
 
-        checkpointer = MemorySaver()
-        return workflow.compile(checkpointer=checkpointer, debug=True)
+        return workflow.compile(checkpointer=self.checkpointer, debug=True)
+
+    def close(self):
+        self.registry.close()
+        self.tool_node.close()
+        SingletonMeta._instances.pop(type(self), None)
 
     def __call__(self, *args, **kwargs):
         return self.app
 
 
-def load_tools_from_folder(folder_path: str, package_prefix: str = "") -> list[Tool]:
+def load_tools_from_folder(
+    folder_path: str, package_prefix: str = ""
+) -> list[BaseTool]:
+    """Collects the tool objects defined in the modules of ``folder_path``.
+
+    Any ``BaseTool`` counts: ``Tool``, ``StructuredTool.from_function`` and
+    ``@tool`` functions alike. Tools with a ``coroutine`` are awaited on the
+    server loop instead of running on the tool thread pool.
+    """
     tools = []
 
     for filename in os.listdir(folder_path):
@@ -211,7 +683,7 @@ def load_tools_from_folder(folder_path: str, package_prefix: str = "") -> list[T
             continue
 
         for name, obj in inspect.getmembers(module):
-            if isinstance(obj, Tool):
+            if isinstance(obj, BaseTool):
                 tools.append(obj)
                 logger.debug(f"Loaded Tool: {name} from {import_path}")
             else:
@@ -1,32 +1,56 @@
-from fastapi import FastAPI
+import secrets
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from llm_manager import LLMEngine
+from prompts import prompt_prefix, refresh_tools
+from utils.config import AdminSettings, ModelSettings, PoolSettings
+from worker_pool import WorkerPool
 from websocket_client import websocket_router
 from contextlib import asynccontextmanager
 
+from utils.html_text import close_parse_pool
+from utils.http_client import aclose_async_client, close_client
 from utils.logger import CustomLogger
+from utils.metrics import render_metrics
 
 logger = CustomLogger(__name__)
 
 
+MODEL_PARAMS = {
+    "max_tokens": 512,
+    "stop": ["<|im_end|>", "<|im_start|>", "<|file_separator|>"],
+    "temperature": 0.4,
+    "top_k": 40,
+    "max_retries": 3,
+    "top_p": 0.75,
+    "frequency_penalty": 1.2,
+    "min_p": 0.0,
+}
+
+
 def initialize_engine() -> LLMEngine:
-    params = {
-        "max_tokens": 512,
-        "stop": ["<|im_end|>", "<|im_start|>", "<|file_separator|>"],
-        "temperature": 0.4,
-        "top_k": 40,
-        "max_retries": 3,
-        "top_p": 0.75,
-        "frequency_penalty": 1.2,
-        "min_p": 0.0,
-    }
-    engine = LLMEngine(**params)
+    engine = LLMEngine(system_prefix=prompt_prefix(), **MODEL_PARAMS)
     engine.warmup()
     logger.info("Engine warmup complete")
     return engine
 
 
-def cleanup_engine(engine: LLMEngine) -> None:
+def initialize_worker_pool(settings: PoolSettings) -> WorkerPool:
+    pool = WorkerPool(
+        n_workers=settings.n_workers,
+        n_threads=ModelSettings().n_threads,
+        system_prefix=prompt_prefix(),
+        pin_cpus=settings.pin_cpus,
+        max_sessions=settings.max_affinity_sessions,
+        **MODEL_PARAMS,
+    )
+    pool.start()
+    logger.info("Worker pool started")
+    return pool
+
+
+def cleanup_engine(engine: LLMEngine | WorkerPool) -> None:
     engine.close()
     logger.info("Engine closed")
 
@@ -36,7 +60,12 @@ async def lifespan(app: FastAPI):
     engine = None
     try:
         logger.info("Lifespan: start")
-        engine = initialize_engine()
+        pool_settings = PoolSettings()
+        if pool_settings.n_workers > 0:
+            engine = initialize_worker_pool(pool_settings)
+            app.state.worker_pool = engine
+        else:
+            engine = initialize_engine()
         yield
     except Exception as e:
         logger.exception(f"Lifespan error: {str(e)}")
@@ -44,6 +73,9 @@ async def lifespan(app: FastAPI):
     finally:
         if engine:
             cleanup_engine(engine)
+        await aclose_async_client()
+        close_client()
+        close_parse_pool()
 
 
 model_app = FastAPI(lifespan=lifespan)
@@ -68,3 +100,40 @@ model_app.add_middleware(
 )
 
 model_app.include_router(websocket_router)
+
+
+def require_admin(authorization: str | None = Header(default=None)) -> None:
+    """Admits requests that carry ``Authorization: Bearer <ADMIN_TOKEN>``.
+
+    Without a token configured the admin endpoints answer 404, as if absent.
+    """
+    token = AdminSettings().admin_token
+    if not token:
+        raise HTTPException(status_code=404)
+    if not secrets.compare_digest(
+        (authorization or "").encode("utf-8"), f"Bearer {token}".encode("utf-8")
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@model_app.post("/admin/reload-tools", dependencies=[Depends(require_admin)])
+def reload_tools(request: Request) -> dict:
+    """Picks up tools added to or removed from the tools folder without a restart."""
+    worker_pool = getattr(request.app.state, "worker_pool", None)
+    if worker_pool is None:
+        return {"changed": LLMEngine().refresh_tools()}
+    # Prompts are formatted here and the prefix is cached in the workers
+    changed = refresh_tools()
+    if changed:
+        worker_pool.refresh_tools()
+    return {"changed": changed}
+
+
+@model_app.get("/metrics")
+def metrics() -> Response:
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
@@ -1,11 +1,15 @@
+import hashlib
 import json
 
+from typing import Any
+
 from langchain_core.messages import (
     SystemMessage,
     HumanMessage,
     AIMessage,
     ToolMessage,
     BaseMessage,
+    get_buffer_string,
 )
 from langchain_core.prompts import ChatPromptTemplate
 
@@ -14,18 +18,20 @@ from utils.logger import CustomLogger
 
 logger = CustomLogger(__name__)
 
-tool_list = load_tools_from_folder("./tools", package_prefix="tools")
-tool_schemas = "\n".join(
-    [
-        f"- {tool.name}: {tool.description.replace('{', '{{').replace('}', '}}')}"
-        for tool in tool_list
-    ]
-)
-logger.debug("Tool schemas loaded: %s", tool_schemas)
+TOOLS_FOLDER = "./tools"
+
+
+def build_tool_schemas(tools: list) -> str:
+    return "\n".join(
+        [
+            f"- {tool.name}: {tool.description.replace('{', '{{').replace('}', '}}')}"
+            for tool in tools
+        ]
+    )
 
 
-def format_input(messages: str):
-    system_message = f"""
+def build_system_prompt(tool_schemas: str) -> str:
+    return f"""
         You are a helpful assistant that can use tools to get information for the user.
         
         # Content Safety:
@@ -74,15 +80,76 @@ def format_input(messages: str):
         - Use `$$ ... $$` for display math blocks.\n
         - Do not explain LaTeX, only use it to present math.
         """.strip()
-    logger.info("Prompt template created successfully.")
 
-    logger.debug("user_message: %s", messages)
-    prompt = ChatPromptTemplate.from_messages(
-        [SystemMessage(content=system_message), HumanMessage(content=messages)]
-    )
-    logger.debug("Prompt: %s", prompt)
 
-    return prompt
+class CompiledPrompt:
+    """System prompt and chat template built once for a frozen set of tools."""
+
+    def __init__(self, tools: list):
+        self.tool_schemas = build_tool_schemas(tools)
+        self.fingerprint = hashlib.sha256(
+            self.tool_schemas.encode("utf-8")
+        ).hexdigest()
+        self.system_prompt = build_system_prompt(self.tool_schemas)
+        system_message = SystemMessage(content=self.system_prompt)
+        self.template = ChatPromptTemplate.from_messages(
+            [system_message, ("human", "{messages}")]
+        )
+        self.prefix = get_buffer_string([system_message])
+        self.tools = tools
+
+
+# Compiled on first use, from the tools folder unless use_tools() came first
+_compiled: CompiledPrompt | None = None
+
+
+def use_tools(tools: list) -> bool:
+    """Compiles the prompt for ``tools``; True when the tool set changed."""
+    global _compiled
+    compiled = CompiledPrompt(tools)
+    if _compiled is not None and compiled.fingerprint == _compiled.fingerprint:
+        return False
+    _compiled = compiled
+    logger.debug("Tool schemas loaded: %s", compiled.tool_schemas)
+    return True
+
+
+def refresh_tools() -> bool:
+    """Reloads the tools folder and recompiles the prompt if the tool set changed.
+
+    Returns True when it did; ``LLMEngine.refresh_tools`` then applies the new
+    ``prompt_tools()`` and ``prompt_prefix()`` to the agent.
+    """
+    if _compiled is None:
+        return False  # nothing compiled yet; the first use reads the folder
+    if not use_tools(load_tools_from_folder(TOOLS_FOLDER, package_prefix="tools")):
+        return False
+    logger.info("Tool set changed, prompt recompiled")
+    return True
+
+
+def compiled_prompt() -> CompiledPrompt:
+    if _compiled is None:
+        use_tools(load_tools_from_folder(TOOLS_FOLDER, package_prefix="tools"))
+    return _compiled
+
+
+def prompt_prefix() -> str:
+    """Text every formatted prompt starts with, before the user message."""
+    return compiled_prompt().prefix
+
+
+def prompt_tools() -> list:
+    """The tools the current prompt was compiled for."""
+    return compiled_prompt().tools
+
+
+def format_input(messages: str) -> ChatPromptTemplate:
+    return compiled_prompt().template.partial(messages=messages)
+
+
+def format_prompt(messages: str) -> str:
+    return compiled_prompt().template.format(messages=messages)
 
 
 def schema_validation(message: BaseMessage) -> dict | None:
@@ -132,3 +199,45 @@ def schema_validation(message: BaseMessage) -> dict | None:
             "role": "unknown",
             "content": str(getattr(message, "content", "")) or "",
         }
+
+
+def stream_event(mode: str, payload: Any) -> dict | None:
+    """Maps one item of a ("messages", "updates") graph stream to a websocket event.
+
+    Token deltas come from the agent node only; tool calls are reported once when
+    the agent requests them and once when the tool node has answered.
+    """
+    if mode == "messages":
+        chunk, metadata = payload
+        if metadata.get("langgraph_node") != "agent" or not isinstance(
+            chunk, AIMessage
+        ):
+            return None
+        if not isinstance(chunk.content, str) or not chunk.content:
+            return None
+        return {"token": {"role": "assistant", "content": chunk.content}}
+
+    if mode == "updates":
+        for node, update in payload.items():
+            messages = (update or {}).get("messages", [])
+            if node == "agent":
+                tool_calls = [
+                    {"id": call["id"], "name": call["name"], "args": call["args"]}
+                    for message in messages
+                    for call in getattr(message, "tool_calls", None) or []
+                ]
+                if tool_calls:
+                    return {"tool_start": tool_calls}
+            elif node == "tools":
+                results = [
+                    {
+                        "id": message.tool_call_id,
+                        "name": message.name,
+                        "status": message.status,
+                    }
+                    for message in messages
+                    if isinstance(message, ToolMessage)
+                ]
+                if results:
+                    return {"tool_end": results}
+    return None
@@ -0,0 +1,17 @@
+from fastapi.testclient import TestClient
+
+from main import model_app
+
+
+def test_reload_tools_requires_the_admin_token(monkeypatch):
+    client = TestClient(model_app)  # no lifespan, so no model is loaded
+
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.post("/admin/reload-tools").status_code == 404
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.post("/admin/reload-tools").status_code == 401
+    response = client.post(
+        "/admin/reload-tools", headers={"Authorization": "Bearer wrong"}
+    )
+    assert response.status_code == 401
@@ -0,0 +1,155 @@
+"""Micro-benchmark of the text extraction behind ``web_search_tool``.
+
+Times ``utils.html_text.clean_html_text`` against ``legacy_clean_html_text``,
+a copy of the extractor it replaced, over the saved pages in
+``test/data/pages`` plus a generated page with deeply nested markup; the
+timings include parsing the page. Run it with ``BENCHMARK=1 pytest
+test/general/test_html_extraction.py`` or directly as a script;
+``BENCH_PAGES`` (or ``--pages``) points it at another directory of saved
+``.html`` files. ``test_parse_html_keeps_visible_text_and_tables`` always
+runs.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pytest
+from selectolax.parser import HTMLParser
+
+from utils.html_text import clean_html_text, extract_main_content, parse_html
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "pages")
+
+
+def legacy_clean_html_text(node) -> str:
+    """The previous extractor, kept verbatim as the baseline."""
+    text_parts = []
+    for el in node.iter():
+        if el.tag in {"script", "style", "meta", "link", "head", "noscript"}:
+            continue
+        text = el.text(strip=True)
+        if not text:
+            continue
+        if re.match(r"^\..*{|^--|^@media|{.*}", text):
+            continue
+        if (
+            ":" in text
+            and ";" in text
+            and re.search(r"--|font|margin|padding|color", text)
+        ):
+            continue
+        if len(text) < 3:
+            continue
+        if el.tag in {"h1", "h2", "h3", "p", "li", "article", "section"}:
+            text_parts.append("\n" + text)
+        else:
+            text_parts.append(text)
+
+    joined = " ".join(text_parts)
+    cleaned = re.sub(r"\s+", " ", joined).strip()
+
+    lines = re.split(r"(?<=[.!?])\s+", cleaned)
+    return "\n".join(line for line in lines if len(line.strip()) > 5)
+
+
+def nested_page(depth: int, paragraphs: int) -> str:
+    """Div soup: ``paragraphs`` sections, each wrapped ``depth`` divs deep."""
+    section = (
+        "<div class='wrap'>" * depth
+        + "<p>Nested paragraph with <b>inline</b> markup and a "
+        + "<a href='#'>link</a>. It ends here.</p>"
+        + "</div>" * depth
+    )
+    return f"<html><body><main>{section * paragraphs}</main></body></html>"
+
+
+def load_pages(path: str, depth: int) -> dict[str, str]:
+    pages = {}
+    for file in sorted(glob.glob(os.path.join(path, "*.html"))):
+        with open(file, encoding="utf-8", errors="replace") as f:
+            pages[os.path.basename(file)] = f.read()
+    pages[f"nested-{depth}.html"] = nested_page(depth, paragraphs=50)
+    return pages
+
+
+@dataclass
+class PageResult:
+    page: str
+    kb: float
+    legacy_ms: float
+    single_pass_ms: float
+    speedup: float
+    chars: int
+
+
+def median_ms(extract, html: str, repeats: int) -> float:
+    # Parsing is timed too, since the new extractor edits the tree it reads
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        extract(HTMLParser(html).body)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_benchmark(path: str = PAGES_DIR, repeats: int = 20, depth: int = 40) -> dict:
+    results = []
+    for name, html in load_pages(path, depth).items():
+        legacy = median_ms(legacy_clean_html_text, html, repeats)
+        single_pass = median_ms(clean_html_text, html, repeats)
+        results.append(
+            PageResult(
+                page=name,
+                kb=round(len(html.encode("utf-8")) / 1024, 1),
+                legacy_ms=round(legacy, 3),
+                single_pass_ms=round(single_pass, 3),
+                speedup=round(legacy / single_pass, 2) if single_pass else 0.0,
+                chars=len(extract_main_content(HTMLParser(html))),
+            )
+        )
+    return {"repeats": repeats, "pages": [asdict(result) for result in results]}
+
+
+def test_parse_html_keeps_visible_text_and_tables():
+    with open(os.path.join(PAGES_DIR, "article.html"), encoding="utf-8") as f:
+        text, tables = parse_html(f.read())
+    assert "nine to two" in text
+    assert "dataLayer" not in text and "font-size" not in text
+    assert tables[0]["headers"] == ["Phase", "Length (km)", "Cost (million)"]
+
+
+@pytest.mark.skipif(
+    not os.getenv("BENCHMARK"), reason="set BENCHMARK=1 to run the benchmark"
+)
+def test_html_extraction_benchmark():
+    report = run_benchmark(os.getenv("BENCH_PAGES", PAGES_DIR))
+    print(json.dumps(report, indent=2))
+    for page in report["pages"]:
+        assert page["chars"] > 0, page["page"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", default=os.getenv("BENCH_PAGES", PAGES_DIR))
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=40, help="of the nested page")
+    parser.add_argument("--output", default=os.getenv("BENCH_OUTPUT"))
+    args = parser.parse_args()
+    report = run_benchmark(args.pages, args.repeats, args.depth)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""End-to-end latency and throughput benchmark for the /stream websocket.
+
+The model is replaced by ``StubLlama``, which streams a fixed number of tokens
+with a fixed delay per token, so runs are comparable on CPU-only machines
+without a GGUF, and the tools folder by ``STUB_TOOLS``, so no network,
+embedding model or Chroma store is touched. Run it with
+``BENCHMARK=1 pytest test/general/test_perfomance.py`` or directly as a script;
+both print a JSON report, which ``BENCH_OUTPUT`` (or ``--output``) also writes
+to a file.
+
+Environment: the project's dependencies, including a CPU build of
+llama-cpp-python; no secrets need to be set.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.tools import tool
+from llama_cpp import LlamaState
+
+from llm_manager import LangGraphAgent, LLMEngine, SingletonMeta
+from prompts import prompt_prefix, use_tools
+from websocket_client import websocket_router
+
+PROMPT_MIX = [
+    {"prompt": "Hi!", "weight": 3},
+    {"prompt": "Summarize the plot of Hamlet in two sentences.", "weight": 2},
+    {
+        "prompt": "Explain step by step how a hash map handles collisions, "
+        "compare separate chaining with open addressing, and give the time "
+        "complexity of lookups in the average and the worst case.",
+        "weight": 1,
+    },
+]
+
+
+@tool
+def stub_lookup(query: str) -> str:
+    """Looks up a query. Returns a canned answer."""
+    return f"No results for {query}"
+
+
+STUB_TOOLS = [stub_lookup]
+
+
+def load_prompt_mix(path: str | None) -> list[dict]:
+    if not path:
+        return PROMPT_MIX
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@dataclass
+class BenchmarkConfig:
+    concurrency: int = int(os.getenv("BENCH_CONCURRENCY", "4"))
+    requests: int = int(os.getenv("BENCH_REQUESTS", "32"))
+    tokens: int = int(os.getenv("BENCH_TOKENS", "32"))
+    token_delay_ms: float = float(os.getenv("BENCH_TOKEN_DELAY_MS", "5"))
+    prompt_mix: list[dict] = field(
+        default_factory=lambda: load_prompt_mix(os.getenv("BENCH_PROMPT_MIX"))
+    )
+
+
+class StubLlama:
+    """Stands in for ``llama_cpp.Llama``, streaming canned tokens at a fixed pace."""
+
+    tokens = 32
+    token_delay = 0.005
+
+    def __init__(self, model_path: str = "stub.gguf", n_ctx: int = 10_000, **kwargs):
+        self.model_path = model_path
+        self.chat_format = kwargs.get("chat_format")
+        # Looked up like Llama's when rendering the cached prompt prefix
+        self.chat_handler = None
+        self._chat_handlers = {}
+        self.verbose = False
+        self.input_ids = np.zeros(n_ctx, dtype=np.intc)
+        self.n_tokens = 0
+        self._n_ctx = n_ctx
+        self.cache = None
+
+    def n_ctx(self) -> int:
+        return self._n_ctx
+
+    def set_cache(self, cache) -> None:
+        self.cache = cache
+
+    def tokenize(self, text: bytes, add_bos: bool = True, special: bool = False):
+        return ([1] if add_bos else []) + list(text)
+
+    def reset(self) -> None:
+        self.n_tokens = 0
+
+    def eval(self, tokens) -> None:
+        self.input_ids[self.n_tokens : self.n_tokens + len(tokens)] = tokens
+        self.n_tokens += len(tokens)
+
+    def save_state(self) -> LlamaState:
+        return LlamaState(
+            input_ids=self.input_ids.copy(),
+            scores=np.zeros((1, 1), dtype=np.single),
+            n_tokens=self.n_tokens,
+            llama_state=b"",
+            llama_state_size=0,
+            seed=0,
+        )
+
+    def load_state(self, state: LlamaState) -> None:
+        self.input_ids = state.input_ids.copy()
+        self.n_tokens = state.n_tokens
+
+    def create_chat_completion(self, messages, stream=False, max_tokens=None, **kwargs):
+        n_tokens = min(max_tokens or self.tokens, self.tokens)
+        base = {"id": "stub", "created": int(time.time()), "model": self.model_path}
+        if not stream:
+            time.sleep(self.token_delay * n_tokens)
+            return {
+                **base,
+                "object": "chat.completion",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {
+                            "role": "assistant",
+                            "content": "".join(f"t{i} " for i in range(n_tokens)),
+                        },
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 0,
+                    "completion_tokens": n_tokens,
+                    "total_tokens": n_tokens,
+                },
+            }
+        return self._stream(base, n_tokens)
+
+    def _stream(self, base: dict, n_tokens: int):
+        for i in range(n_tokens):
+            time.sleep(self.token_delay)
+            yield {
+                **base,
+                "object": "chat.completion.chunk",
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": f"t{i} "},
+                        "finish_reason": None,
+                    }
+                ],
+            }
+        yield {
+            **base,
+            "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+def run_request(client: TestClient, prompt: str) -> dict:
+    token_times = []
+    error = None
+    with client.websocket_connect("/stream") as websocket:
+        started = time.perf_counter()
+        websocket.send_json({"messages": prompt})
+        while True:
+            message = websocket.receive_json()
+            if "token" in message:
+                token_times.append(time.perf_counter())
+            elif "error" in message:
+                error = message["error"]
+                break
+            elif message.get("done"):
+                break
+        finished = time.perf_counter()
+
+    return {
+        "ttft": token_times[0] - started if token_times else None,
+        "itl": list(np.diff(token_times)),
+        "e2e": finished - started,
+        "tokens": len(token_times),
+        "error": error,
+    }
+
+
+def run_benchmark(client: TestClient, config: BenchmarkConfig) -> dict:
+    prompts = [
+        item["prompt"] for item in config.prompt_mix for _ in range(item["weight"])
+    ]
+    schedule = [prompts[i % len(prompts)] for i in range(config.requests)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+        results = list(
+            executor.map(lambda prompt: run_request(client, prompt), schedule)
+        )
+    wall_time = time.perf_counter() - started
+
+    completed = [result for result in results if result["error"] is None]
+    total_tokens = sum(result["tokens"] for result in completed)
+    return {
+        "config": asdict(config),
+        "requests": len(results),
+        "errors": len(results) - len(completed),
+        "wall_time_s": wall_time,
+        "tokens_per_s": total_tokens / wall_time if wall_time else 0.0,
+        "requests_per_s": len(completed) / wall_time if wall_time else 0.0,
+        "ttft_s": percentiles(
+            [result["ttft"] for result in completed if result["ttft"] is not None]
+        ),
+        "itl_s": percentiles([gap for result in completed for gap in result["itl"]]),
+        "e2e_s": percentiles([result["e2e"] for result in completed]),
+    }
+
+
+def write_report(report: dict, output: str | None) -> None:
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def start_engine(config: BenchmarkConfig) -> LLMEngine:
+    StubLlama.tokens = config.tokens
+    StubLlama.token_delay = config.token_delay_ms / 1000
+    LangGraphAgent.llama_factory = StubLlama
+    use_tools(STUB_TOOLS)
+    engine = LLMEngine(
+        system_prefix=prompt_prefix(), tools=STUB_TOOLS, max_tokens=config.tokens
+    )
+    engine.warmup()
+    return engine
+
+
+def stop_engine(engine: LLMEngine) -> None:
+    engine.close()
+    SingletonMeta._instances.pop(LLMEngine, None)
+
+
+@pytest.mark.skipif(
+    not os.getenv("BENCHMARK"), reason="set BENCHMARK=1 to run the benchmark"
+)
+def test_stream_benchmark(monkeypatch):
+    config = BenchmarkConfig()
+    monkeypatch.setattr(LangGraphAgent, "llama_factory", StubLlama)
+    engine = start_engine(config)
+    try:
+        app = FastAPI()
+        app.include_router(websocket_router)
+        with TestClient(app) as client:
+            report = run_benchmark(client, config)
+    finally:
+        stop_engine(engine)
+
+    write_report(report, os.getenv("BENCH_OUTPUT"))
+    assert report["errors"] == 0
+    assert report["ttft_s"]["p50"] is not None
+
+
+def main() -> None:
+    defaults = BenchmarkConfig()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument("--requests", type=int, default=defaults.requests)
+    parser.add_argument("--tokens", type=int, default=defaults.tokens)
+    parser.add_argument("--token-delay-ms", type=float, default=defaults.token_delay_ms)
+    parser.add_argument(
+        "--prompt-mix", help="JSON file with a list of {prompt, weight} objects"
+    )
+    parser.add_argument("--output", default=os.getenv("BENCH_OUTPUT"))
+    args = parser.parse_args()
+
+    config = BenchmarkConfig(
+        concurrency=args.concurrency,
+        requests=args.requests,
+        tokens=args.tokens,
+        token_delay_ms=args.token_delay_ms,
+    )
+    if args.prompt_mix:
+        config.prompt_mix = load_prompt_mix(args.prompt_mix)
+
+    engine = start_engine(config)
+    try:
+        app = FastAPI()
+        app.include_router(websocket_router)
+        with TestClient(app) as client:
+            report = run_benchmark(client, config)
+    finally:
+        stop_engine(engine)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
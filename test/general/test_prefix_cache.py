@@ -0,0 +1,81 @@
+"""Checks the cached system prompt prefix against prompts Llama really builds.
+
+Only the vocabulary of the GGUF at ``MODEL_PATH`` (the ``ModelSettings``
+default otherwise) is loaded; the test is skipped when the file is missing.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pytest
+from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from llama_cpp import Llama
+
+from llama_cpp_chat_model.prefix_cache import PrefixCache
+from prompts import format_prompt, prompt_prefix, use_tools
+from utils.config import ModelSettings
+
+
+@tool
+def quote_lookup(query: str) -> str:
+    """Finds "quoted" text, <b>tags</b> & all. Returns it as is."""
+    return query
+
+
+class PromptBuilt(Exception):
+    pass
+
+
+@pytest.fixture(scope="module")
+def llama():
+    settings = ModelSettings()
+    if not os.path.exists(settings.model_path):
+        pytest.skip(f"no model at {settings.model_path}")
+    return Llama(
+        model_path=settings.model_path,
+        chat_format=settings.chat_format,
+        vocab_only=True,
+        verbose=False,
+    )
+
+
+def rendered_prompt(llama: Llama, monkeypatch, **kwargs) -> list[int]:
+    """Tokens of the prompt ``create_chat_completion`` would evaluate."""
+    prompts = []
+
+    def create_completion(prompt, **_):
+        prompts.append(prompt)
+        raise PromptBuilt
+
+    monkeypatch.setattr(llama, "create_completion", create_completion)
+    with pytest.raises(PromptBuilt):
+        llama.create_chat_completion(**kwargs)
+    prompt = prompts[0]
+    if isinstance(prompt, str):
+        return llama.tokenize(prompt.encode("utf-8"), special=True)
+    return list(prompt)
+
+
+@pytest.mark.parametrize("with_tools", [False, True])
+def test_rendered_prompt_starts_with_prefix_tokens(llama, monkeypatch, with_tools):
+    use_tools([quote_lookup])
+    prefix_cache = PrefixCache(prompt_prefix())
+    prefix_cache.tokenize(llama)
+
+    kwargs = {}
+    if with_tools:
+        kwargs = {
+            "tools": [convert_to_openai_tool(quote_lookup)],
+            "tool_choice": "auto",
+        }
+    prompt = format_prompt("What's <new> & \"hot\" today?")
+    tokens = rendered_prompt(
+        llama, monkeypatch, messages=[{"role": "user", "content": prompt}], **kwargs
+    )
+
+    assert tokens[: prefix_cache.n_tokens] == prefix_cache.tokens
+    # Only the tokens at the very end of the prefix may be left out
+    assert prefix_cache.n_tokens > len(llama.tokenize(prompt_prefix().encode())) * 0.9
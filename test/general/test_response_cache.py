@@ -0,0 +1,67 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import tool
+
+from llm_manager import LangGraphAgent
+from utils.config import ModelSettings
+from utils.response_cache import ResponseCache
+
+MESSAGES = [HumanMessage(content="What is a hash map?")]
+
+
+@tool
+def stub_lookup(query: str) -> str:
+    """Looks up a query. Returns a canned answer."""
+    return query
+
+
+@pytest.fixture
+def cache_key(monkeypatch):
+    # Slots are never asked to generate, so they only need their settings
+    monkeypatch.setattr(
+        LangGraphAgent, "llama_factory", lambda **params: SimpleNamespace(**params)
+    )
+
+    def cache_key(model: str | None = None, **agent_kwargs) -> str:
+        agent = LangGraphAgent(tools=[stub_lookup], **agent_kwargs)
+        try:
+            return ResponseCache.key(MESSAGES, agent.generation_params(model), None)
+        finally:
+            agent.close()
+
+    return cache_key
+
+
+def test_key_changes_with_the_model_that_answers(cache_key):
+    small = ModelSettings(model_path="models/nlp/small.gguf")
+    big = ModelSettings(model_path="models/nlp/big.gguf")
+    key = cache_key(models={"default": small, "answer": big})
+
+    assert key == cache_key(models={"default": small, "answer": big})
+    assert key != cache_key(models={"default": big, "answer": big})
+    assert key != cache_key(
+        models={"default": small, "answer": big}, answer_model="answer"
+    )
+    assert key != cache_key("answer", models={"default": small, "answer": big})
+    assert key != cache_key(
+        models={
+            "default": ModelSettings(model_path=small.model_path, chat_format="chatml"),
+            "answer": big,
+        }
+    )
+
+
+def test_key_changes_with_the_sampling_params(cache_key):
+    models = {"default": ModelSettings(model_path="models/nlp/small.gguf")}
+    key = cache_key(models=models)
+
+    assert key != cache_key(models=models, temperature=0.7)
+    assert cache_key(models=models, temperature=0.7) != cache_key(
+        models=models, temperature=0.2
+    )
@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import numpy as np
+import pytest
+
+from llama_cpp_chat_model.speculative import MeteredDraftModel
+from llm_manager import LangGraphAgent
+from utils.config import ModelSettings
+
+
+def ids(*tokens: int) -> np.ndarray:
+    return np.array(tokens, dtype=np.intc)
+
+
+def test_metering_skips_a_draft_left_over_from_the_previous_generation():
+    verified = []
+    metered = MeteredDraftModel(
+        lambda input_ids: ids(4, 5), on_verified=lambda *counts: verified.append(counts)
+    )
+
+    metered(ids(1, 2, 3))
+    metered(ids(1, 2, 3, 4, 9))  # first drafted token kept, second rejected
+    assert verified == [(2, 1)]
+
+    metered(ids(7, 8, 9, 10, 11, 12))  # a new prompt, longer but unrelated
+    metered(ids(7, 8))  # another, shorter than the drafted context
+    assert verified == [(2, 1)]
+
+    metered(ids(7, 8, 4, 5, 6))
+    assert verified == [(2, 1), (2, 2)]
+    assert metered.acceptance_rate == 0.75
+
+
+def test_speculative_slot_evaluates_a_prompt_longer_than_n_batch():
+    settings = ModelSettings(
+        n_ctx=256, n_batch=32, n_gpu_layers=0, n_threads=2, verbose=False
+    )
+    if not os.path.exists(settings.model_path):
+        pytest.skip(f"no model at {settings.model_path}")
+
+    scheduler = LangGraphAgent._build_scheduler(
+        settings.llama_params(),
+        draft_params={"strategy": "prompt_lookup", "num_pred_tokens": 4},
+    )
+    try:
+        llama = scheduler.slots[0]
+        prompt = "The quick brown fox jumps over the lazy dog. " * 12
+        assert len(llama.tokenize(prompt.encode("utf-8"))) > settings.n_batch
+        completion = llama.create_completion(prompt, max_tokens=8, temperature=0.0)
+        assert completion["choices"][0]["finish_reason"] in ("stop", "length")
+    finally:
+        scheduler.close()
@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pytest
+from diskcache import Cache
+
+from tools.weather import GeocodeIndex
+
+PLACES = {
+    "Paris": [{"lat": "48.8534", "lon": "2.3488"}],
+    "Parish": [{"lat": "43.4050", "lon": "-76.1294"}],
+    "Springfield": [{"lat": "39.8017", "lon": "-89.6437"}],
+    "Springfields": [{"lat": "53.7593", "lon": "-2.7858"}],
+}
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    index = GeocodeIndex(Cache(str(tmp_path)), fuzzy_cutoff=0.9, miss_ttl=60)
+    searches = []
+
+    def search(location: str) -> list:
+        searches.append(location)
+        return PLACES.get(location, [])
+
+    monkeypatch.setattr(index, "_search", search)
+    index.searches = searches
+    return index
+
+
+def coordinates(name: str) -> tuple[float, float]:
+    place = PLACES[name][0]
+    return float(place["lat"]), float(place["lon"])
+
+
+@pytest.mark.parametrize(
+    "first,second", [("Paris", "Parish"), ("Springfield", "Springfields")]
+)
+def test_similar_names_of_different_places_are_geocoded_apart(index, first, second):
+    assert index.resolve(first) == coordinates(first)
+    assert index.resolve(second) == coordinates(second)
+    assert index.searches == [first, second]
+
+
+def test_unknown_misspelling_falls_back_to_closest_known_place(index, monkeypatch):
+    paris = index.resolve("Paris")
+    assert index.resolve("Pariss") == paris  # Nominatim has no match
+
+    def unreachable(location: str) -> list:
+        raise ConnectionError("Nominatim is down")
+
+    monkeypatch.setattr(index, "_search", unreachable)
+    assert index.resolve("Parris") == paris
+    with pytest.raises(ConnectionError):
+        index.resolve("Lyon")
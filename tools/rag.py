@@ -1,11 +1,9 @@
-import os
-from langchain_community.document_loaders import UnstructuredURLLoader
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from threading import Thread
+
 from langchain_core.tools import Tool
 from pydantic import BaseModel
-import shutil
+
+from utils.rag_store import document_count, get_retriever, settings, warm_retriever
 
 
 class RagInput(BaseModel):
@@ -14,32 +12,16 @@ class RagInput(BaseModel):
 
 def retrieve_context(query: str) -> str:
     """Returns specific knowledge in local database based on a query."""
-    urls = [
-        "https://docs.python.org/3/tutorial/index.html",
-        "https://realpython.com/python-basics/",
-        "https://www.learnpython.org/",
-    ]
-    loader = UnstructuredURLLoader(urls=urls)
-    docs = loader.load()
-
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=50)
-    doc_splits = text_splitter.split_documents(docs)
-
-    persist_dir = "../data/chroma"
-    if os.path.exists(persist_dir):
-        shutil.rmtree(persist_dir)
-
-    vectorstore = Chroma.from_documents(
-        documents=doc_splits,
-        collection_name="python_docs",
-        embedding=HuggingFaceEmbeddings(model_name="BAAI/bge-small-en-v1.5"),
-        persist_directory=persist_dir,
-    )
-    retriever = vectorstore.as_retriever()
-    results = retriever.invoke(query)
+    if not document_count():
+        return "The knowledge base is empty."
+    results = get_retriever().invoke(query)
     return "\n".join([doc.page_content for doc in results])
 
 
+if settings.rag_warm_on_start:
+    Thread(target=warm_retriever, name="rag-warmup", daemon=True).start()
+
+
 retrieve_context_tool = Tool(
     name="retrieve_context",
     func=retrieve_context,
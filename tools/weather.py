@@ -1,36 +1,170 @@
+import difflib
+import re
+import time
+import unicodedata
+from threading import Lock
+
+from diskcache import Cache
 from langchain_core.tools import Tool
 from pydantic import BaseModel
-import requests
+
+from utils.config import WeatherSettings
+from utils.http_client import get
+from utils.logger import CustomLogger
+
+logger = CustomLogger(__name__)
+
+settings = WeatherSettings()
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_INTERVAL_SECONDS = 1.0  # usage policy: at most one request per second
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+CURRENT_FIELDS = "cloud_cover,wind_speed_10m,wind_direction_10m,temperature_2m,relative_humidity_2m,is_day,rain"
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
 
 
 class WeatherInput(BaseModel):
     location: str
 
 
-def get_weather_by_location(location: str) -> str:
-    """Returns current weather conditions for a specified city or location."""
-    geo_response = requests.get(
-        "https://nominatim.openstreetmap.org/search",
-        params={"q": location, "format": "json"},
-        headers={"User-Agent": "MyApp/1.0 (contact@example.com)"},
-    )
-    geo_results = geo_response.json()
-    if not geo_results:
-        raise ValueError(f"Location '{location}' not found.")
-    latitude = geo_results[0]["lat"]
-    longitude = geo_results[0]["lon"]
-
-    weather_response = requests.get(
-        "https://api.open-meteo.com/v1/forecast",
+def normalize_location(location: str) -> str:
+    """Folds case, accents, punctuation and spacing: "São  Paulo!" -> "sao paulo"."""
+    text = unicodedata.normalize("NFKD", location)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = _PUNCTUATION.sub(" ", text.casefold())
+    return _SPACES.sub(" ", text).strip()
+
+
+class GeocodeIndex:
+    """Resolved place names kept on disk, so known places never hit Nominatim.
+
+    Coordinates don't change, so entries never expire. Lookups match the
+    normalized name; only a name Nominatim doesn't know, or can't be asked
+    about, falls back to the closest known name above ``fuzzy_cutoff``, since
+    distinct places can be spelt alike ("paris", "parish"). Names Nominatim
+    doesn't know are remembered for ``miss_ttl`` seconds.
+    """
+
+    def __init__(self, cache: Cache, fuzzy_cutoff: float, miss_ttl: int):
+        self.cache = cache
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.miss_ttl = miss_ttl
+        self._names: dict[str, tuple[float, float]] | None = None
+        self._lock = Lock()
+        self._request_lock = Lock()
+        self._last_request = 0.0
+
+    def _known(self) -> dict[str, tuple[float, float]]:
+        if self._names is None:
+            self._names = {
+                key.removeprefix("geo:"): self.cache[key]
+                for key in self.cache.iterkeys()
+                if isinstance(key, str) and key.startswith("geo:")
+            }
+        return self._names
+
+    def lookup(self, location: str) -> tuple[float, float] | None:
+        name = normalize_location(location)
+        with self._lock:
+            return self._known().get(name)
+
+    def closest(self, location: str) -> tuple[float, float] | None:
+        name = normalize_location(location)
+        with self._lock:
+            known = self._known()
+            match = difflib.get_close_matches(
+                name, known.keys(), n=1, cutoff=self.fuzzy_cutoff
+            )
+            if not match:
+                return None
+            logger.debug("Geocoded %r as known place %r", location, match[0])
+            return known[match[0]]
+
+    def resolve(self, location: str) -> tuple[float, float]:
+        coordinates = self.lookup(location)
+        if coordinates is not None:
+            return coordinates
+
+        name = normalize_location(location)
+        # Another worker process may have resolved it since the index was read
+        coordinates = self.cache.get(f"geo:{name}")
+        if coordinates is not None:
+            with self._lock:
+                self._known()[name] = coordinates
+            return coordinates
+
+        if not self.cache.get(f"geo-miss:{name}"):
+            try:
+                results = self._search(location)
+            except Exception:
+                coordinates = self.closest(location)
+                if coordinates is None:
+                    raise
+                return coordinates
+            if results:
+                coordinates = (float(results[0]["lat"]), float(results[0]["lon"]))
+                with self._lock:
+                    self.cache.set(f"geo:{name}", coordinates)
+                    self._known()[name] = coordinates
+                return coordinates
+            self.cache.set(f"geo-miss:{name}", True, expire=self.miss_ttl)
+
+        coordinates = self.closest(location)
+        if coordinates is None:
+            raise ValueError(f"Location '{location}' not found.")
+        return coordinates
+
+    def _search(self, location: str) -> list:
+        with self._request_lock:
+            wait = self._last_request + NOMINATIM_INTERVAL_SECONDS - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.monotonic()
+        response = get(
+            NOMINATIM_URL,
+            params={"q": location, "format": "json"},
+            headers={"User-Agent": "MyApp/1.0 (contact@example.com)"},
+        )
+        return response.json()
+
+
+_cache = Cache(settings.weather_cache_dir)
+geocode_index = GeocodeIndex(
+    _cache, settings.geocode_fuzzy_cutoff, settings.geocode_miss_ttl_seconds
+)
+
+
+def current_weather(latitude: float, longitude: float) -> dict | str:
+    """Current conditions, cached per coordinate rounded to a shared grid cell."""
+    latitude = round(latitude, settings.weather_coord_decimals)
+    longitude = round(longitude, settings.weather_coord_decimals)
+    key = f"weather:{latitude}:{longitude}"
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    weather_response = get(
+        OPEN_METEO_URL,
         params={
             "latitude": latitude,
             "longitude": longitude,
-            "current": "cloud_cover,wind_speed_10m,wind_direction_10m,temperature_2m,relative_humidity_2m,is_day,rain",
+            "current": CURRENT_FIELDS,
         },
     )
     weather_data = weather_response.json()
-    current_weather = weather_data.get("current", "No weather data available.")
-    return str(current_weather)
+    current = weather_data.get("current")
+    if current is None:
+        return "No weather data available."
+    _cache.set(key, current, expire=settings.weather_ttl_seconds)
+    return current
+
+
+def get_weather_by_location(location: str) -> str:
+    """Returns current weather conditions for a specified city or location."""
+    latitude, longitude = geocode_index.resolve(location)
+    return str(current_weather(latitude, longitude))
 
 
 get_weather_tool = Tool(
@@ -0,0 +1,143 @@
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import Any
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from utils.logger import CustomLogger
+from utils.tracing import get_tracer
+
+logger = CustomLogger(__name__)
+
+
+def _payload_size(value: Any) -> int:
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_payload_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_payload_size(item) for item in value.values())
+    return 0
+
+
+class BoundedMemorySaver(MemorySaver):
+    """In-memory checkpointer that evicts whole conversation threads.
+
+    Threads are dropped least-recently-used first once there are more than
+    ``max_threads`` of them or their serialized payloads exceed ``max_bytes``, and
+    whenever they have been idle for longer than ``ttl_seconds``.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = 1000,
+        ttl_seconds: float = 3600,
+        max_bytes: int = 512 * 1024 * 1024,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        # thread_id -> [last access, payload bytes], least recently used first
+        self._threads: OrderedDict[str, list] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = RLock()
+
+    @property
+    def thread_count(self) -> int:
+        return len(self._threads)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get_tuple(self, config):
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            if thread_id in self._threads:
+                self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        started = time.perf_counter()
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            size = _payload_size(
+                self.storage[thread_id][checkpoint_ns].get(checkpoint["id"])
+            )
+            size += sum(
+                _payload_size(self.blobs.get((thread_id, checkpoint_ns, k, v)))
+                for k, v in new_versions.items()
+            )
+            self._touch(thread_id, size)
+            self._evict(keep=thread_id)
+
+        tracer = get_tracer()
+        if tracer is not None:
+            tracer.record(
+                "checkpoint.put",
+                "checkpoint",
+                time.perf_counter() - started,
+                parent_id=tracer.root_for_thread(thread_id),
+                bytes=size,
+            )
+        return result
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            key = (
+                thread_id,
+                config["configurable"].get("checkpoint_ns", ""),
+                config["configurable"]["checkpoint_id"],
+            )
+            before = _payload_size(self.writes.get(key))
+            super().put_writes(config, writes, task_id, task_path)
+            self._touch(thread_id, _payload_size(self.writes.get(key)) - before)
+            self._evict(keep=thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            super().delete_thread(thread_id)
+            entry = self._threads.pop(thread_id, None)
+            if entry is not None:
+                self._total_bytes -= entry[1]
+
+    def _touch(self, thread_id: str, added_bytes: int = 0) -> None:
+        entry = self._threads.pop(thread_id, None) or [0.0, 0]
+        entry[0] = time.monotonic()
+        entry[1] += added_bytes
+        self._threads[thread_id] = entry
+        self._total_bytes += added_bytes
+
+    def _evict(self, keep: str) -> None:
+        now = time.monotonic()
+        remaining_threads = len(self._threads)
+        remaining_bytes = self._total_bytes
+        expired = []
+        for thread_id, (last_access, size) in self._threads.items():
+            if thread_id == keep:
+                continue
+            over_budget = (
+                remaining_threads > self.max_threads
+                or remaining_bytes > self.max_bytes
+            )
+            if not over_budget and now - last_access <= self.ttl_seconds:
+                break
+            expired.append(thread_id)
+            remaining_threads -= 1
+            remaining_bytes -= size
+
+        for thread_id in expired:
+            self.delete_thread(thread_id)
+        if expired:
+            logger.info(
+                "Evicted %d conversation thread(s), %d left using %d bytes",
+                len(expired),
+                len(self._threads),
+                self._total_bytes,
+            )
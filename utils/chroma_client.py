@@ -1,37 +1,67 @@
+import json
+import time
+from dataclasses import dataclass
 from typing import Any
 
 import chromadb
 from chromadb import QueryResult
-from sentence_transformers import SentenceTransformer
 import uuid
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 
+from utils.config import EmbeddingSettings, SemanticCacheSettings
+from utils.embeddings import aget_embedding_service
 from utils.logger import CustomLogger
+from utils.metrics import SEMANTIC_CACHE_REQUESTS
 
 logger = CustomLogger(__name__)
 
 client = chromadb.PersistentClient(
     path="./data/chroma",
 )
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+CACHE_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
 queries_cache = client.get_or_create_collection(
     name="queries_cache", metadata={"type": "cache"}
 )
 
-executor = ThreadPoolExecutor()
+executor = ThreadPoolExecutor(
+    max_workers=EmbeddingSettings().chroma_max_workers, thread_name_prefix="chroma"
+)
+
+cache_settings = SemanticCacheSettings()
+_last_eviction = 0.0
+_legacy_purged = False
+_eviction_lock = Lock()
+
+
+@dataclass
+class CacheLookup:
+    """A semantic cache lookup; ``embedding`` is reused to store a miss's result."""
+
+    embedding: list[float]
+    result: Any = None
+    hit: bool = False
 
 
 async def async_embed(query: str) -> list[float]:
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(executor, lambda: embedder.encode(query).tolist())
+    # Batched with concurrent queries on the shared service's own thread
+    service = await aget_embedding_service(CACHE_EMBEDDING_MODEL)
+    return await service.async_embed(query)
 
 
 async def async_chroma_query(query_vec: list[float]) -> QueryResult:
+    # Expired entries, and ones without created_at, never match
+    oldest = time.time() - cache_settings.semantic_cache_ttl_seconds
     loop = asyncio.get_running_loop()
     return await loop.run_in_executor(
-        executor, lambda: queries_cache.query(query_embeddings=[query_vec], n_results=1)
+        executor,
+        lambda: queries_cache.query(
+            query_embeddings=[query_vec],
+            n_results=1,
+            where={"created_at": {"$gte": oldest}},
+        ),
     )
 
 
@@ -47,20 +77,79 @@ async def async_chroma_add(
     )
 
 
-async def search_with_semantic_cache(query: Any) -> Any | None:
+def purge_legacy_entries() -> None:
+    """Deletes entries stored before created_at was recorded.
+
+    Lookups already skip them, but the TTL sweep can't match a missing field.
+    """
+    entries = queries_cache.get(include=["metadatas"])
+    legacy = [
+        id_
+        for id_, meta in zip(entries["ids"], entries["metadatas"], strict=True)
+        if "created_at" not in (meta or {})
+    ]
+    if legacy:
+        queries_cache.delete(ids=legacy)
+        logger.info(f"Deleted {len(legacy)} semantic cache entries without created_at")
+
+
+def evict_entries() -> None:
+    """Deletes expired entries, then the oldest ones beyond the size cap."""
+    global _last_eviction, _legacy_purged
+    now = time.time()
+    with _eviction_lock:
+        if now - _last_eviction < cache_settings.semantic_cache_evict_interval_seconds:
+            return
+        _last_eviction = now
+        purge_legacy = not _legacy_purged
+        _legacy_purged = True
+
+    if purge_legacy:
+        purge_legacy_entries()
+    oldest = now - cache_settings.semantic_cache_ttl_seconds
+    queries_cache.delete(where={"created_at": {"$lt": oldest}})
+    excess = queries_cache.count() - cache_settings.semantic_cache_max_entries
+    if excess > 0:
+        entries = queries_cache.get(include=["metadatas"])
+        by_age = sorted(
+            zip(entries["ids"], entries["metadatas"], strict=True),
+            key=lambda entry: (entry[1] or {}).get("created_at", 0),
+        )
+        queries_cache.delete(ids=[id_ for id_, _ in by_age[:excess]])
+        logger.info(f"Evicted {excess} semantic cache entries over the size cap")
+
+
+async def search_with_semantic_cache(query: Any) -> CacheLookup:
     query_vec = await async_embed(query)
     results = await async_chroma_query(query_vec)
-    logger.info("Retrieved results from cache: %s", results)
+    logger.debug("Retrieved results from cache: %s", results)
 
     docs = results.get("documents", [])
     distances = results.get("distances", [])
 
-    if docs and docs[0] and distances and distances[0] and distances[0][0] < 0.15:
-        return docs[0][0]
-    return None
-
-
-async def generate_new_result(query: str, new_result: str | list[str] | None) -> None:
-    query_vec = await async_embed(query)
-    logger.info("New query vector generated: %s", query_vec)
-    await async_chroma_add(str(uuid.uuid4()), query_vec, new_result, {"query": query})
+    if (
+        docs
+        and docs[0]
+        and distances
+        and distances[0]
+        and distances[0][0] < cache_settings.semantic_cache_max_distance
+    ):
+        SEMANTIC_CACHE_REQUESTS.labels(result="hit").inc()
+        return CacheLookup(query_vec, json.loads(docs[0][0]), hit=True)
+    SEMANTIC_CACHE_REQUESTS.labels(result="miss").inc()
+    return CacheLookup(query_vec)
+
+
+async def generate_new_result(
+    query: str, new_result: Any, query_vec: list[float] | None = None
+) -> None:
+    """Stores ``new_result`` as JSON, under the lookup's embedding when given."""
+    if query_vec is None:
+        query_vec = await async_embed(query)
+    await async_chroma_add(
+        str(uuid.uuid4()),
+        query_vec,
+        json.dumps(new_result, ensure_ascii=False),
+        {"query": query, "created_at": time.time()},
+    )
+    await asyncio.get_running_loop().run_in_executor(executor, evict_entries)
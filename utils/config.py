@@ -24,6 +24,10 @@ class DatabaseSettings(BaseSettings):
         env_file = "./config/database.env"
 
 
+# ModelSettings fields that configure the runtime around Llama, not Llama itself
+NON_LLAMA_PREFIXES = ("kv_cache_", "draft_")
+
+
 class ModelSettings(BaseSettings):
     model_path: str = "models/nlp/gemma-3-4b-it-qat-UD-Q5_K_XL.gguf"
     chat_format: str = "chatml-function-calling"
@@ -34,7 +38,168 @@ class ModelSettings(BaseSettings):
     use_mmap: bool = True
     n_ctx: int = 10_000
     verbose: bool = True
+    # Persistent KV state store for resuming conversations, off unless a dir is set
+    kv_cache_dir: str | None = None
+    kv_cache_capacity_mb: int = 4096
+    kv_cache_block_size: int = 64
+    # Speculative decoding: None, "prompt_lookup" or "draft_model". Each slot then
+    # keeps logits for every context position, n_ctx * n_vocab * 4 bytes
+    draft_strategy: str | None = None
+    draft_num_pred_tokens: int = 10
+    draft_max_ngram_size: int = 2  # prompt_lookup only
+    draft_model_path: str | None = None  # draft_model only, same vocabulary
+
+    def llama_params(self) -> dict:
+        return {
+            name: value
+            for name, value in self.model_dump().items()
+            if not name.startswith(NON_LLAMA_PREFIXES)
+        }
+
+    def draft_params(self) -> dict:
+        return {
+            name.removeprefix("draft_"): value
+            for name, value in self.model_dump().items()
+            if name.startswith("draft_")
+        }
+
+
+class RegistrySettings(BaseSettings):
+    # Extra models by name, as ModelSettings overrides, e.g. as JSON in MODELS:
+    # {"answer": {"model_path": "models/nlp/big.gguf", "n_ctx": 8192}}
+    models: dict[str, dict] = {}
+    default_model: str = "default"  # ModelSettings itself, always loaded
+    tool_model: str | None = None  # turns that may call tools
+    answer_model: str | None = None  # answers written from tool results
+    model_ram_budget_mb: int = 0  # unload idle models beyond this; 0 = never
+
+
+class SchedulerSettings(BaseSettings):
+    n_slots: int = 1  # Llama contexts sharing the mmap'd weights; n_threads is split
+    max_queue_size: int = 64
+    max_buffered_chunks: int = 64
+
+
+class PoolSettings(BaseSettings):
+    n_workers: int = 0  # model worker processes; 0 serves from the API process
+    pin_cpus: bool = False  # give each worker its own share of the allowed CPUs
+    max_affinity_sessions: int = 10_000
+
+
+class ToolSettings(BaseSettings):
+    tool_timeout_seconds: float = 30.0
+    # Per tool name, e.g. as JSON in TOOL_TIMEOUTS: {"web_search_tool": 20}
+    tool_timeouts: dict[str, float] = {}
+    tool_max_workers: int = 8  # threads shared by the sync tools of all turns
+
+
+class HttpSettings(BaseSettings):
+    http_timeout_seconds: float = 10.0
+    http_connect_timeout_seconds: float = 5.0
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    http_max_per_host: int = 8  # concurrent requests to one host
+    http_retries: int = 2  # idempotent requests only
+    http_backoff_seconds: float = 0.5  # doubled per retry, with jitter
+    http2: bool = True  # used when the h2 package is installed
+
+
+class EmbeddingSettings(BaseSettings):
+    embedding_max_batch_size: int = 32  # texts per encode call
+    embedding_max_wait_ms: float = 5.0  # how long a batch waits to fill up
+    embedding_device: str | None = None  # sentence-transformers picks when unset
+    chroma_max_workers: int = 4  # threads for Chroma queries and writes
+
+
+class SemanticCacheSettings(BaseSettings):
+    semantic_cache_ttl_seconds: int = 6 * 3600  # search results go stale
+    semantic_cache_max_entries: int = 10_000  # oldest entries are evicted beyond
+    semantic_cache_max_distance: float = 0.15  # closest match must be nearer
+    semantic_cache_evict_interval_seconds: int = 60
+
+
+class QueryCacheSettings(BaseSettings):
+    # In-process exact-match tier in front of the semantic cache
+    query_cache_ttl_seconds: int = 300
+    query_cache_max_entries: int = 1024
+    query_cache_max_mb: int = 32  # by the JSON size of the cached results
+
+
+class HtmlParseSettings(BaseSettings):
+    html_parse_workers: int = 2  # processes extracting page text; 0 uses a thread
+
+
+class RagSettings(BaseSettings):
+    rag_persist_dir: str = "./data/rag"
+    rag_collection: str = "python_docs"
+    rag_embedding_model: str = "BAAI/bge-small-en-v1.5"
+    rag_sources: list[str] = [
+        "https://docs.python.org/3/tutorial/index.html",
+        "https://realpython.com/python-basics/",
+        "https://www.learnpython.org/",
+    ]
+    rag_chunk_size: int = 100
+    rag_chunk_overlap: int = 50
+    rag_top_k: int = 4
+    rag_embed_batch_size: int = 256  # chunks per embedding call during ingestion
+    rag_warm_on_start: bool = True  # load the embedder when the tool is imported
+
+
+class WeatherSettings(BaseSettings):
+    weather_cache_dir: str = "./data/weather_cache"
+    weather_ttl_seconds: int = 600  # current conditions per rounded coordinate
+    weather_coord_decimals: int = 2  # ~1 km, close enough to share a forecast
+    geocode_fuzzy_cutoff: float = 0.9  # difflib ratio for misspelt known places
+    geocode_miss_ttl_seconds: int = 86_400  # unknown names, not retried for a day
+
+
+class ResponseCacheSettings(BaseSettings):
+    # Final answers by conversation, model and sampling params; off by default
+    response_cache_enabled: bool = False
+    response_cache_dir: str = "./data/response_cache"
+    response_cache_ttl_seconds: int = 24 * 3600
+    response_cache_size_mb: int = 256
+    # Answers that used these tools depend on when they were asked
+    response_cache_bypass_tools: list[str] = [
+        "datetime_now",
+        "get_weather_by_location",
+        "web_search_tool",
+    ]
+
+
+class TracingSettings(BaseSettings):
+    trace_path: str | None = None  # JSON lines file for spans; tracing is off without
+
+
+class AdminSettings(BaseSettings):
+    admin_token: str | None = None  # the /admin endpoints are off until this is set
+
+
+class LoggingSettings(BaseSettings):
+    log_level: str = "INFO"  # records below this are never built or formatted
+    log_format: str = "text"  # "text" or "json" (one object per line)
+    log_max_message_chars: int = 2000  # longer messages are truncated
+    log_debug_sample_rate: float = 1.0  # fraction of DEBUG records kept
+    log_queue_size: int = 10_000  # records waiting for the writer; extra are dropped
+
+
+class SessionSettings(BaseSettings):
+    max_sessions: int = 1000
+    session_ttl_seconds: int = 3600
+    session_memory_mb: int = 512
+
+
+# Built on first access, so modules that only read the settings above (the
+# logger, for one) import without the search API and database secrets
+_LAZY_SETTINGS = {
+    "service_settings": ServiceSettings,
+    "database_settings": DatabaseSettings,
+}
 
 
-service_settings = ServiceSettings()
-database_settings = DatabaseSettings()
+def __getattr__(name: str):
+    if name not in _LAZY_SETTINGS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    settings = globals()[name] = _LAZY_SETTINGS[name]()
+    return settings
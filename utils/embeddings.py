@@ -0,0 +1,150 @@
+import asyncio
+import queue
+import time
+from concurrent.futures import Future
+from threading import Lock, Thread
+
+from langchain_core.embeddings import Embeddings
+
+from utils.config import EmbeddingSettings
+from utils.logger import CustomLogger
+
+logger = CustomLogger(__name__)
+
+settings = EmbeddingSettings()
+
+
+class EmbeddingService:
+    """Encodes texts for one sentence-transformers model in micro-batches.
+
+    Requests from any thread or event loop go on a queue. A single worker
+    thread takes the first waiting text, collects more until it has
+    ``max_batch_size`` of them or ``max_wait_ms`` has passed, and encodes them
+    in one call. Concurrent traffic thus shares forward passes, and encoding
+    never takes more than one thread per model.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_batch_size: int = settings.embedding_max_batch_size,
+        max_wait_ms: float = settings.embedding_max_wait_ms,
+        device: str | None = settings.embedding_device,
+    ):
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"Loading embedding model {model_name}")
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device=device)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._requests: queue.Queue = queue.Queue()
+        self._worker = Thread(target=self._run, name=f"embed-{model_name}", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self._requests.put((text, future))
+        return future
+
+    def embed(self, text: str) -> list[float]:
+        return self.submit(text).result()
+
+    async def async_embed(self, text: str) -> list[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        """Encodes a ready batch, e.g. during ingestion, in the caller's thread."""
+        vectors = self.model.encode(texts, batch_size=self.max_batch_size)
+        return vectors.tolist()
+
+    def _collect(self) -> list[tuple[str, Future]] | None:
+        first = self._requests.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._requests.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                self._requests.put(None)  # stop after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while (batch := self._collect()) is not None:
+            # Drop requests whose callers gave up while they waited
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                vectors = self.model.encode(
+                    [text for text, _ in batch], batch_size=len(batch)
+                )
+                # A short result fails the whole batch rather than leaving callers
+                encoded = list(zip(batch, vectors, strict=True))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in encoded:
+                future.set_result(vector.tolist())
+
+    def close(self) -> None:
+        self._requests.put(None)
+        self._worker.join()
+
+
+# model name -> the service, resolved once its model has loaded
+_services: dict[str, Future] = {}
+_lock = Lock()
+
+
+def get_embedding_service(model_name: str) -> EmbeddingService:
+    """The process-wide service for ``model_name``, loading the model once.
+
+    The first caller loads it without holding the registry lock, so other
+    models stay available meanwhile; concurrent callers wait for that load.
+    """
+    with _lock:
+        loading = _services.get(model_name)
+        first = loading is None
+        if first:
+            loading = _services[model_name] = Future()
+    if first:
+        try:
+            loading.set_result(EmbeddingService(model_name))
+        except BaseException as e:
+            with _lock:
+                del _services[model_name]  # the next caller tries again
+            loading.set_exception(e)
+            raise
+    return loading.result()
+
+
+async def aget_embedding_service(model_name: str) -> EmbeddingService:
+    """Same as ``get_embedding_service``, loading the model off the event loop."""
+    loading = _services.get(model_name)
+    if loading is not None and loading.done():
+        return loading.result()
+    return await asyncio.to_thread(get_embedding_service, model_name)
+
+
+class ServiceEmbeddings(Embeddings):
+    """LangChain ``Embeddings`` backed by the shared service of a model."""
+
+    def __init__(self, model_name: str):
+        self.service = get_embedding_service(model_name)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.service.embed_many(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.service.embed(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self.service.async_embed(text)
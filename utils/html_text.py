@@ -0,0 +1,129 @@
+import asyncio
+import multiprocessing as mp
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import List, Tuple
+
+from selectolax.parser import HTMLParser, Node
+
+from utils.config import HtmlParseSettings
+from utils.logger import CustomLogger
+
+logger = CustomLogger(__name__)
+
+SKIP_TAGS = ["script", "style", "meta", "link", "head", "noscript", "template"]
+
+CSS_RULE = re.compile(r"^\..*{|^--|^@media|{.*}")  # style declarations, media queries
+CSS_PROPERTY = re.compile(r"--|font|margin|padding|color")
+WHITESPACE = re.compile(r"\s+")
+SPACE_BEFORE_PUNCTUATION = re.compile(r" ([,.;:!?)])")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def is_noise(line: str) -> bool:
+    if len(line) <= 5:
+        return True  # noise like "." or stray words
+    if CSS_RULE.match(line):
+        return True
+    # Anything resembling raw CSS
+    return ":" in line and ";" in line and CSS_PROPERTY.search(line) is not None
+
+
+def clean_html_text(node: Node) -> str:
+    """Extracts only visible, meaningful text from a Selectolax HTML tree.
+
+    Garbage subtrees are dropped in place, then a single ``text()`` call reads
+    every remaining text node once, so the cost is linear in the page size
+    whatever its nesting. The tree is modified.
+    """
+    node.strip_tags(SKIP_TAGS)
+    # Text nodes are joined with spaces, so inline tags don't glue words together
+    text = WHITESPACE.sub(" ", node.text(separator=" "))
+    text = SPACE_BEFORE_PUNCTUATION.sub(r"\1", text).strip()
+    lines = SENTENCE_END.split(text)
+    return "\n".join(line for line in lines if not is_noise(line))
+
+
+def extract_main_content(tree: HTMLParser) -> str:
+    for selector in ["article", "main", "section", "div.content", "div#main"]:
+        node = tree.css_first(selector)
+        if node:
+            return clean_html_text(node)
+    return clean_html_text(tree.body) if tree.body else ""
+
+
+def extract_tables(tree: HTMLParser) -> List[dict]:
+    tables = []
+    for table in tree.css("table"):
+        headers = [th.text(strip=True) for th in table.css("th")]
+        rows = []
+        for tr in table.css("tr"):
+            cells = [td.text(strip=True) for td in tr.css("td")]
+            if cells:
+                rows.append(cells)
+        tables.append({"headers": headers, "rows": rows})
+    return tables
+
+
+def parse_html(html: str) -> Tuple[str, List[dict]]:
+    """Main text and tables of a page; top-level so a process pool can run it."""
+    tree = HTMLParser(html)
+    tables = extract_tables(tree)  # before extract_main_content edits the tree
+    return extract_main_content(tree), tables
+
+
+settings = HtmlParseSettings()
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = Lock()
+
+
+def get_parse_pool() -> ProcessPoolExecutor | None:
+    """The shared parser processes, started on first use; None when disabled."""
+    global _pool
+    if settings.html_parse_workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: the server process runs threads of its own
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.html_parse_workers,
+                mp_context=mp.get_context("spawn"),
+            )
+        return _pool
+
+
+def discard_parse_pool(broken: ProcessPoolExecutor) -> None:
+    """Drops a pool whose process died, so the next call starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def async_parse_html(html: str) -> Tuple[str, List[dict]]:
+    """Parses off the event loop, in the pool or else the default executor.
+
+    A pool broken by a dead process is replaced and the page retried once; if
+    the page breaks the new pool too, ``BrokenProcessPool`` is raised.
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        pool = get_parse_pool()
+        try:
+            return await loop.run_in_executor(pool, parse_html, html)
+        except BrokenProcessPool:
+            logger.error("HTML parser process died, restarting the pool")
+            discard_parse_pool(pool)
+            if attempt:
+                raise
+
+
+def close_parse_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
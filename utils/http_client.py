@@ -0,0 +1,193 @@
+import asyncio
+import random
+import time
+from threading import BoundedSemaphore, Lock
+from urllib.parse import urlsplit
+from weakref import WeakKeyDictionary
+
+import httpx
+
+from utils.config import HttpSettings
+from utils.logger import CustomLogger
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = CustomLogger(__name__)
+
+settings = HttpSettings()
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def _client_params() -> dict:
+    return {
+        "http2": settings.http2 and HTTP2_AVAILABLE,
+        "timeout": httpx.Timeout(
+            settings.http_timeout_seconds,
+            connect=settings.http_connect_timeout_seconds,
+        ),
+        "limits": httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        ),
+        "follow_redirects": True,
+    }
+
+
+def _host(url) -> str:
+    return urlsplit(str(url)).netloc
+
+
+def _backoff(attempt: int, response: httpx.Response | None) -> float:
+    retry_after = response.headers.get("Retry-After") if response else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), settings.http_timeout_seconds)
+    return settings.http_backoff_seconds * 2**attempt * random.uniform(0.5, 1.0)
+
+
+def _should_retry(method: str, attempt: int, retries: int) -> bool:
+    return method.upper() in IDEMPOTENT_METHODS and attempt < retries
+
+
+class _LoopClient:
+    """An AsyncClient and its per-host semaphores, bound to one event loop."""
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(**_client_params())
+        self.host_slots: dict[str, asyncio.Semaphore] = {}
+
+    def host_slot(self, host: str) -> asyncio.Semaphore:
+        slot = self.host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(settings.http_max_per_host)
+            self.host_slots[host] = slot
+        return slot
+
+
+# AsyncClient connections belong to the loop that opened them, so each loop
+# (the server's, or one from a sync tool's asyncio.run) gets its own client
+_loop_clients: WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopClient] = (
+    WeakKeyDictionary()
+)
+_sync_client: httpx.Client | None = None
+_sync_host_slots: dict[str, BoundedSemaphore] = {}
+_lock = Lock()
+
+
+def _loop_client() -> _LoopClient:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        loop_client = _loop_clients.get(loop)
+        if loop_client is None or loop_client.client.is_closed:
+            loop_client = _loop_clients[loop] = _LoopClient()
+        return loop_client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """The pooled client of the running event loop."""
+    return _loop_client().client
+
+
+def get_client() -> httpx.Client:
+    """The pooled client for sync code, shared by all threads."""
+    global _sync_client
+    with _lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(**_client_params())
+        return _sync_client
+
+
+def _sync_host_slot(host: str) -> BoundedSemaphore:
+    with _lock:
+        slot = _sync_host_slots.get(host)
+        if slot is None:
+            slot = BoundedSemaphore(settings.http_max_per_host)
+            _sync_host_slots[host] = slot
+        return slot
+
+
+async def async_request(
+    method: str, url: str, retries: int | None = None, **kwargs
+) -> httpx.Response:
+    """Sends a request on the shared client, retrying idempotent ones.
+
+    Connection errors, timeouts and 429/502/503/504 responses are retried with
+    exponential backoff, honouring ``Retry-After``. The last response is
+    returned as is, so callers still decide what a bad status means.
+    """
+    loop_client = _loop_client()
+    slot = loop_client.host_slot(_host(url))
+    retries = settings.http_retries if retries is None else retries
+    attempt = 0
+    while True:
+        response = None
+        try:
+            async with slot:
+                response = await loop_client.client.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            if not _should_retry(method, attempt, retries):
+                return response
+        except httpx.TransportError as e:
+            if not _should_retry(method, attempt, retries):
+                raise
+            logger.debug("Retrying %s %s after %r", method, url, e)
+        await asyncio.sleep(_backoff(attempt, response))
+        attempt += 1
+
+
+async def async_get(url: str, **kwargs) -> httpx.Response:
+    return await async_request("GET", url, **kwargs)
+
+
+def request(
+    method: str, url: str, retries: int | None = None, **kwargs
+) -> httpx.Response:
+    """Blocking counterpart of ``async_request`` on the shared sync client."""
+    client = get_client()
+    slot = _sync_host_slot(_host(url))
+    retries = settings.http_retries if retries is None else retries
+    attempt = 0
+    while True:
+        response = None
+        try:
+            with slot:
+                response = client.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            if not _should_retry(method, attempt, retries):
+                return response
+        except httpx.TransportError as e:
+            if not _should_retry(method, attempt, retries):
+                raise
+            logger.debug("Retrying %s %s after %r", method, url, e)
+        time.sleep(_backoff(attempt, response))
+        attempt += 1
+
+
+def get(url: str, **kwargs) -> httpx.Response:
+    return request("GET", url, **kwargs)
+
+
+async def aclose_async_client() -> None:
+    """Closes the running loop's client, e.g. before the loop shuts down."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        loop_client = _loop_clients.pop(loop, None)
+    if loop_client is not None:
+        await loop_client.client.aclose()
+
+
+def close_client() -> None:
+    global _sync_client
+    with _lock:
+        sync_client, _sync_client = _sync_client, None
+    if sync_client is not None:
+        sync_client.close()
@@ -1,10 +1,18 @@
-import copy
+import atexit
+import json
 import logging
 import os
+import queue
+import random
 from datetime import datetime
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from threading import Lock
+
+from utils.config import LoggingSettings
 
 LOG_DIR = "./data/logs"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
 
 
 class CustomFormatter(logging.Formatter):
@@ -18,35 +26,153 @@ class CustomFormatter(logging.Formatter):
     }
 
     def format(self, record):
-        colored_record = copy.copy(record)
-        levelness = colored_record.levelname
+        # Records reaching the writer thread are private to it, no copy needed
+        levelness = record.levelname
         color = self.COLORS.get(levelness, self.COLORS["RESET"])
-        colored_record.levelness = f"{color}{levelness}{self.COLORS['RESET']}"
-        return super().format(colored_record)
+        record.levelness = f"{color}{levelness}{self.COLORS['RESET']}"
+        return super().format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and exception."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Keeps only a random ``rate`` fraction of DEBUG records."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class AsyncQueueHandler(QueueHandler):
+    """Hands records to the writer thread without blocking the caller.
+
+    The message is rendered here, while the objects it refers to are still
+    live, and truncated to ``max_chars``. A full queue drops the record.
+    """
+
+    def __init__(self, log_queue: queue.Queue, max_chars: int):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+        self.dropped = 0
+        self._traceback_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        # CustomLogger records don't propagate, so this handler owns them
+        message = record.getMessage()
+        if self.max_chars and len(message) > self.max_chars:
+            cut = len(message) - self.max_chars
+            message = f"{message[: self.max_chars]}... [{cut} chars truncated]"
+        record.msg = message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._traceback_formatter.formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class FileRouter(logging.Handler):
+    """Writes each logger's records to its own rotating file in the dated dir."""
+
+    def __init__(self, formatter: logging.Formatter):
+        super().__init__()
+        self.setFormatter(formatter)
+        self._files: dict[str, RotatingFileHandler] = {}
+
+    def emit(self, record):
+        handler = self._files.get(record.name)
+        if handler is None:
+            date_str = datetime.now().strftime("%d-%m-%Y")
+            dated_log_dir = os.path.join(LOG_DIR, date_str)
+            os.makedirs(dated_log_dir, exist_ok=True)
+            handler = RotatingFileHandler(
+                os.path.join(dated_log_dir, f"{record.name}.log"),
+                maxBytes=5 * 1024 * 1024,
+                backupCount=5,
+            )
+            handler.setFormatter(self.formatter)
+            self._files[record.name] = handler
+        handler.handle(record)
+
+    def close(self):
+        for handler in self._files.values():
+            handler.close()
+        self._files.clear()
+        super().close()
+
+
+_handler: AsyncQueueHandler | None = None
+_listener: QueueListener | None = None
+_lock = Lock()
+
+
+def _pipeline() -> AsyncQueueHandler:
+    """Starts the shared queue and its writer thread on first use."""
+    global _handler, _listener
+    with _lock:
+        if _handler is None:
+            settings = LoggingSettings()
+            if settings.log_format == "json":
+                formatter = JsonFormatter()
+            else:
+                formatter = CustomFormatter(LOG_FORMAT)
+            log_queue = queue.Queue(maxsize=settings.log_queue_size)
+            _handler = AsyncQueueHandler(log_queue, settings.log_max_message_chars)
+            if settings.log_debug_sample_rate < 1.0:
+                _handler.addFilter(DebugSampler(settings.log_debug_sample_rate))
+            _listener = QueueListener(log_queue, FileRouter(formatter))
+            _listener.start()
+            atexit.register(shutdown_logging)
+        return _handler
+
+
+def shutdown_logging() -> None:
+    """Writes out the queued records and closes the log files."""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
 
 
 class CustomLogger(logging.Logger):
     def __init__(self, name: str):
-        super().__init__(name, level=logging.DEBUG)
+        super().__init__(name, level=LoggingSettings().log_level.upper())
         self._configure_handlers()
 
     def _configure_handlers(self):
         if self.handlers:
             return
 
-        date_str = datetime.now().strftime("%d-%m-%Y")
-        dated_log_dir = os.path.join(LOG_DIR, date_str)
-        os.makedirs(dated_log_dir, exist_ok=True)
-
-        formatter = CustomFormatter(
-            "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
-        )
-        log_file = os.path.join(dated_log_dir, f"{self.name}.log")
-        for uvicorn_logger in ["uvicorn", "uvicorn.error", "uvicorn.access"]:
+        for uvicorn_logger in UVICORN_LOGGERS:
             logging.getLogger(uvicorn_logger).handlers.clear()
             logging.getLogger(uvicorn_logger).propagate = False
-        rotating_handler = RotatingFileHandler(
-            log_file, maxBytes=5 * 1024 * 1024, backupCount=5
-        )
-        rotating_handler.setFormatter(formatter)
-        self.addHandler(rotating_handler)
+        self.addHandler(_pipeline())
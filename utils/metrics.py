@@ -0,0 +1,176 @@
+import os
+import time
+from threading import Lock
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    ProcessCollector,
+    generate_latest,
+    multiprocess,
+)
+
+# With PROMETHEUS_MULTIPROC_DIR set, model worker processes write their samples
+# there and /metrics aggregates them; gauges then say how to combine processes
+
+PROMPT_PREFIX_TOKENS = Gauge(
+    "llm_prompt_prefix_tokens",
+    "Tokens in the system prompt prefix whose KV state is cached",
+    ["model"],
+    multiprocess_mode="max",
+)
+
+SPECULATIVE_DRAFT_TOKENS = Counter(
+    "llm_speculative_draft_tokens",
+    "Tokens proposed by the speculative decoding draft model",
+)
+
+SPECULATIVE_ACCEPTED_TOKENS = Counter(
+    "llm_speculative_accepted_tokens",
+    "Draft tokens accepted by the main model",
+)
+
+QUEUE_DEPTH = Gauge(
+    "llm_queue_depth",
+    "Completions waiting for a free Llama slot",
+    multiprocess_mode="livesum",
+)
+
+ACTIVE_SLOTS = Gauge(
+    "llm_active_slots",
+    "Llama slots currently generating",
+    multiprocess_mode="livesum",
+)
+
+ACTIVE_SESSIONS = Gauge(
+    "llm_active_sessions",
+    "Conversation sessions held by the checkpointer",
+    multiprocess_mode="livesum",
+)
+
+OPEN_CONNECTIONS = Gauge(
+    "llm_open_connections",
+    "Open /stream websocket connections",
+    multiprocess_mode="livesum",
+)
+
+QUEUE_WAIT_SECONDS = Histogram(
+    "llm_queue_wait_seconds",
+    "Time a completion waited for a Llama slot",
+)
+
+PROMPT_EVAL_SECONDS = Histogram(
+    "llm_prompt_eval_seconds",
+    "Time from starting a streamed completion to its first chunk",
+)
+
+DECODE_SECONDS = Histogram(
+    "llm_decode_seconds",
+    "Time from the first to the last chunk of a streamed completion",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80),
+)
+
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens",
+    "Prompt tokens per completion",
+    buckets=TOKEN_BUCKETS,
+)
+
+COMPLETION_TOKENS = Histogram(
+    "llm_completion_tokens",
+    "Generated tokens per completion",
+    buckets=TOKEN_BUCKETS,
+)
+
+TOOL_SECONDS = Histogram(
+    "llm_tool_seconds",
+    "Tool call latency",
+    ["tool"],
+)
+
+TOOL_ERRORS = Counter(
+    "llm_tool_errors",
+    "Tool calls that raised an error",
+    ["tool"],
+)
+
+SEMANTIC_CACHE_REQUESTS = Counter(
+    "llm_semantic_cache_requests",
+    "Semantic cache lookups by result (hit or miss)",
+    ["result"],
+)
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    "llm_response_cache_requests",
+    "Final-answer cache lookups by result (hit, miss or bypass)",
+    ["result"],
+)
+
+
+def observe_generation(request) -> None:
+    """Records a finished scheduler request (``LlamaScheduler.on_finished``)."""
+    QUEUE_WAIT_SECONDS.observe(request.started_at - request.enqueued_at)
+    if request.stream and request.first_chunk_at is not None:
+        PROMPT_EVAL_SECONDS.observe(request.first_chunk_at - request.started_at)
+        DECODE_SECONDS.observe(request.finished_at - request.first_chunk_at)
+    PROMPT_TOKENS.observe(request.prompt_tokens)
+    COMPLETION_TOKENS.observe(request.completion_tokens)
+
+
+class ToolMetricsHandler(BaseCallbackHandler):
+    """Times tool runs and counts their errors, labelled by tool name."""
+
+    run_inline = True
+
+    def __init__(self, tool_names: list[str] = ()):
+        self._started: dict[UUID, tuple[str, float]] = {}
+        self._lock = Lock()
+        # Known tools show up with zero counts before their first call
+        for name in tool_names:
+            TOOL_SECONDS.labels(tool=name)
+            TOOL_ERRORS.labels(tool=name)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        with self._lock:
+            self._started[run_id] = (name, time.perf_counter())
+
+    def _finish(self, run_id: UUID) -> str | None:
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is None:
+            return None
+        name, started_at = started
+        TOOL_SECONDS.labels(tool=name).observe(time.perf_counter() - started_at)
+        return name
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_error(self, error, *, run_id: UUID, **kwargs):
+        name = self._finish(run_id)
+        if name is not None:
+            TOOL_ERRORS.labels(tool=name).inc()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Returns the exposition text and its content type."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        ProcessCollector(registry=registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
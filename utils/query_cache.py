@@ -0,0 +1,88 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Awaitable, Callable
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive key: "  Latest  NEWS " -> "latest news"."""
+    return " ".join(query.casefold().split())
+
+
+class QueryCache:
+    """Exact-match LRU cache with a TTL and a cap on entries and payload bytes.
+
+    Sizes are the length of the JSON-encoded value, so values must be JSON
+    serialisable, which cached tool results are anyway.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_bytes: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self._entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.n_bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        size = len(json.dumps(value, ensure_ascii=False, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.n_bytes -= previous[1]
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self.n_bytes += size
+            while self._over_capacity():
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.n_bytes -= evicted
+
+    def _over_capacity(self) -> bool:
+        return len(self._entries) > self.max_entries or self.n_bytes > self.max_bytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.n_bytes = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight task.
+
+    The task is shielded, so a caller that gives up (e.g. on a tool timeout)
+    doesn't cancel the fetch the other callers are waiting for.
+    """
+
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def run(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(fetch())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
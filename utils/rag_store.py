@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.vectorstores import VectorStoreRetriever
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from utils.config import RagSettings
+from utils.embeddings import ServiceEmbeddings
+from utils.http_client import get
+from utils.logger import CustomLogger
+
+logger = CustomLogger(__name__)
+
+settings = RagSettings()
+
+MANIFEST_FILE = "manifest.json"
+
+
+def get_embeddings() -> ServiceEmbeddings:
+    return ServiceEmbeddings(settings.rag_embedding_model)
+
+
+@lru_cache(maxsize=1)
+def get_vectorstore() -> Chroma:
+    """The persistent collection built by ``ingest.py``, opened once per process."""
+    return Chroma(
+        collection_name=settings.rag_collection,
+        embedding_function=get_embeddings(),
+        persist_directory=settings.rag_persist_dir,
+    )
+
+
+def get_retriever() -> VectorStoreRetriever:
+    return get_vectorstore().as_retriever(search_kwargs={"k": settings.rag_top_k})
+
+
+def document_count() -> int:
+    return get_vectorstore()._collection.count()
+
+
+def warm_retriever() -> None:
+    """Loads the embedder and opens the collection ahead of the first query."""
+    try:
+        get_embeddings().embed_query("warmup")
+        logger.info(f"RAG store ready with {document_count()} chunks")
+    except Exception as e:
+        logger.error(f"Failed to warm the RAG store: {e}")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Chunk ids are content hashes, so an unchanged chunk keeps its id."""
+    return content_hash(f"{source}\0{text}")
+
+
+def load_manifest(path: str) -> dict[str, dict]:
+    """Per source URL: etag, last_modified, content_hash and chunk ids."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path: str, manifest: dict[str, dict]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def html_to_text(html: str) -> str:
+    # Same partitioning UnstructuredURLLoader does, on a page we fetched ourselves
+    from unstructured.partition.html import partition_html
+
+    return "\n\n".join(str(element) for element in partition_html(text=html))
+
+
+@dataclass
+class IngestStats:
+    unchanged_sources: list[str] = field(default_factory=list)
+    changed_sources: list[str] = field(default_factory=list)
+    removed_sources: list[str] = field(default_factory=list)
+    added_chunks: int = 0
+    deleted_chunks: int = 0
+    kept_chunks: int = 0
+
+
+class Ingestor:
+    """Brings the collection in line with a list of sources, touching only changes.
+
+    Each source is fetched with ``If-None-Match``/``If-Modified-Since`` from the
+    manifest, so unchanged pages cost a 304. Changed pages are split and the
+    chunk ids compared with the manifest: only new chunks are embedded, in
+    batches of ``batch_size`` across sources, and vanished ones are deleted.
+    """
+
+    def __init__(
+        self,
+        store: Chroma,
+        manifest_path: str,
+        batch_size: int = settings.rag_embed_batch_size,
+    ):
+        self.store = store
+        self.manifest_path = manifest_path
+        self.batch_size = batch_size
+        self.manifest = load_manifest(manifest_path)
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=settings.rag_chunk_size,
+            chunk_overlap=settings.rag_chunk_overlap,
+        )
+        self._pending: list[tuple[str, str, str]] = []  # (id, text, source)
+        self._pending_entries: dict[str, dict] = {}
+
+    def run(self, sources: list[str], prune: bool = True) -> IngestStats:
+        stats = IngestStats()
+        for source, entry, text in self._fetch_changed(sources, stats):
+            self._diff(source, entry, text, stats)
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+        self._flush()
+
+        if prune:
+            for source in set(self.manifest) - set(sources):
+                removed = self.manifest.pop(source)["chunks"]
+                self._delete(removed)
+                stats.deleted_chunks += len(removed)
+                stats.removed_sources.append(source)
+        save_manifest(self.manifest_path, self.manifest)
+        return stats
+
+    def _fetch_changed(
+        self, sources: list[str], stats: IngestStats
+    ) -> Iterator[tuple[str, dict, str]]:
+        for source in sources:
+            previous = self.manifest.get(source, {})
+            headers = {}
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
+            try:
+                response = get(source, headers=headers)
+                if response.status_code == 304:
+                    stats.unchanged_sources.append(source)
+                    continue
+                response.raise_for_status()
+            except Exception as e:
+                logger.error(f"Failed to fetch {source}, keeping its chunks: {e}")
+                continue
+
+            entry = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "content_hash": content_hash(response.text),
+                "chunks": previous.get("chunks", []),
+            }
+            if entry["content_hash"] == previous.get("content_hash"):
+                self.manifest[source] = entry
+                stats.unchanged_sources.append(source)
+                continue
+            stats.changed_sources.append(source)
+            yield source, entry, html_to_text(response.text)
+
+    def _diff(self, source: str, entry: dict, text: str, stats: IngestStats) -> None:
+        chunks = {}
+        for chunk in self.text_splitter.split_text(text):
+            chunks.setdefault(chunk_id(source, chunk), chunk)
+        old_ids = set(entry["chunks"])
+
+        stale = [id_ for id_ in entry["chunks"] if id_ not in chunks]
+        self._delete(stale)
+        stats.deleted_chunks += len(stale)
+        stats.kept_chunks += len(old_ids & chunks.keys())
+        for id_, chunk in chunks.items():
+            if id_ not in old_ids:
+                self._pending.append((id_, chunk, source))
+                stats.added_chunks += 1
+
+        # The manifest takes the new entry once its chunks are stored
+        self._pending_entries[source] = {**entry, "chunks": list(chunks)}
+
+    def _flush(self) -> None:
+        while self._pending:
+            batch = self._pending[: self.batch_size]
+            self._pending = self._pending[self.batch_size :]
+            self.store.add_texts(
+                texts=[text for _, text, _ in batch],
+                metadatas=[{"source": source} for _, _, source in batch],
+                ids=[id_ for id_, _, _ in batch],
+            )
+            logger.info(f"Embedded and stored {len(batch)} chunks")
+        self.manifest.update(self._pending_entries)
+        self._pending_entries.clear()
+        save_manifest(self.manifest_path, self.manifest)
+
+    def _delete(self, ids: list[str]) -> None:
+        if ids:
+            self.store.delete(ids=ids)
+
+
+def ingest(
+    sources: list[str] | None = None, prune: bool = True, full: bool = False
+) -> IngestStats:
+    """Syncs the collection with ``sources`` (default ``RAG_SOURCES``).
+
+    ``prune`` drops sources missing from the list; ``full`` starts over.
+    """
+    sources = sources or settings.rag_sources
+    manifest_path = os.path.join(settings.rag_persist_dir, MANIFEST_FILE)
+    if full:
+        get_vectorstore().delete_collection()
+        get_vectorstore.cache_clear()
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+    stats = Ingestor(get_vectorstore(), manifest_path).run(sources, prune=prune)
+    logger.info(
+        f"Ingested {len(stats.changed_sources)} changed sources: "
+        f"{stats.added_chunks} chunks added, {stats.deleted_chunks} deleted, "
+        f"{stats.kept_chunks} kept"
+    )
+    return stats
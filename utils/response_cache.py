@@ -0,0 +1,73 @@
+import hashlib
+import json
+from typing import Sequence
+
+from diskcache import Cache
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+
+def normalize_content(content) -> str:
+    if not isinstance(content, str):
+        content = json.dumps(content, sort_keys=True, default=str)
+    return " ".join(content.split())
+
+
+class ResponseCache:
+    """Final answers on disk, keyed by everything that determines them.
+
+    The key hashes the normalized conversation (history plus the new input),
+    what generates the answer (each agent node's resolved model name, model
+    file, chat format and sampling params) and the system prefix. A turn that called
+    one of ``bypass_tools`` is never stored, since its answer depends on when
+    it was asked.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ttl_seconds: int,
+        size_limit_bytes: int,
+        bypass_tools: Sequence[str] = (),
+    ):
+        self.ttl = ttl_seconds
+        self.bypass_tools = set(bypass_tools)
+        self._cache = Cache(
+            directory,
+            size_limit=size_limit_bytes,
+            eviction_policy="least-recently-used",
+        )
+
+    @staticmethod
+    def key(
+        messages: Sequence[BaseMessage],
+        generation: dict,
+        system_prefix: str | None,
+    ) -> str:
+        payload = {
+            "messages": [
+                [message.type, normalize_content(message.content)]
+                for message in messages
+            ],
+            "generation": generation,
+            "system_prefix": system_prefix,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        return self._cache.get(key)
+
+    def cacheable(self, turn: Sequence[BaseMessage]) -> bool:
+        """True when the turn ended in a plain answer without bypassed tools."""
+        if not turn or not isinstance(turn[-1], AIMessage) or turn[-1].tool_calls:
+            return False
+        return not any(
+            isinstance(message, ToolMessage) and message.name in self.bypass_tools
+            for message in turn
+        )
+
+    def set(self, key: str, answer: str) -> None:
+        self._cache.set(key, answer, expire=self.ttl)
+
+    def close(self) -> None:
+        self._cache.close()
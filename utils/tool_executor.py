@@ -0,0 +1,94 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+from typing import Sequence
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool
+from langgraph.prebuilt import ToolNode
+
+from utils.logger import CustomLogger
+from utils.metrics import TOOL_ERRORS
+
+logger = CustomLogger(__name__)
+
+
+def is_async_tool(tool: BaseTool) -> bool:
+    """True when the tool has a coroutine of its own rather than a thread hop."""
+    if getattr(tool, "coroutine", None) is not None:
+        return True
+    return type(tool)._arun is not BaseTool._arun and not hasattr(tool, "func")
+
+
+class ConcurrentToolNode(ToolNode):
+    """Runs all tool calls of a turn at once, each under its own timeout.
+
+    Async tools are awaited on the caller's loop and sync tools run on a
+    bounded thread pool, so a turn takes as long as its slowest tool. A call
+    that outlives its timeout becomes an error ``ToolMessage`` for the model to
+    read. Async tools are cancelled; a thread can't be, so a timed out sync tool
+    keeps its worker until it returns.
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[BaseTool],
+        timeout: float = 30.0,
+        timeouts: dict[str, float] | None = None,
+        max_workers: int = 8,
+        **kwargs,
+    ):
+        super().__init__(tools, **kwargs)
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tool"
+        )
+
+    def timeout_for(self, name: str) -> float:
+        return self.timeouts.get(name, self.timeout)
+
+    def _timed_out(self, call, timeout: float) -> ToolMessage:
+        logger.warning("Tool %s timed out after %.1fs", call["name"], timeout)
+        TOOL_ERRORS.labels(tool=call["name"]).inc()
+        return ToolMessage(
+            content=f"Error: {call['name']} did not finish within {timeout:g}s",
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    def _run_one(self, call, input_type, config):
+        timeout = self.timeout_for(call["name"])
+        context = contextvars.copy_context()
+        future = self._executor.submit(
+            context.run, super()._run_one, call, input_type, config
+        )
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            return self._timed_out(call, timeout)
+
+    async def _arun_one(self, call, input_type, config):
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None or is_async_tool(tool):
+            run = super()._arun_one(call, input_type, config)
+        else:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            run = loop.run_in_executor(
+                self._executor,
+                partial(context.run, super()._run_one, call, input_type, config),
+            )
+
+        timeout = self.timeout_for(call["name"])
+        try:
+            return await asyncio.wait_for(run, timeout)
+        except asyncio.TimeoutError:
+            return self._timed_out(call, timeout)
+
+    def close(self, cancel_pending: bool = True) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=cancel_pending)
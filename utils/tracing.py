@@ -0,0 +1,271 @@
+import json
+import os
+import queue
+import time
+from threading import Lock, Thread
+from typing import Any
+from uuid import UUID, uuid4
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils.logger import CustomLogger
+
+logger = CustomLogger(__name__)
+
+# LangGraph nodes worth a span; the runnables inside them are folded into these
+TRACED_NODES = {"agent", "tools"}
+_UNTRACED = object()
+
+
+class JsonLinesExporter:
+    """Appends finished spans to a JSON lines file from a background thread."""
+
+    def __init__(self, path: str, max_pending: int = 10_000):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._pending: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._dropped = 0
+        self._writer = Thread(
+            target=self._write_loop, name="span-writer", daemon=True
+        )
+        self._writer.start()
+
+    def export(self, span: dict) -> None:
+        try:
+            self._pending.put_nowait(span)
+        except queue.Full:
+            self._dropped += 1
+
+    def _write_loop(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                span = self._pending.get()
+                if span is None:
+                    return
+                f.write(json.dumps(span, default=str) + "\n")
+                if self._pending.empty():
+                    f.flush()
+
+    def close(self) -> None:
+        self._pending.put(None)
+        self._writer.join()
+        if self._dropped:
+            logger.warning(f"Dropped {self._dropped} span(s) while the writer lagged")
+
+
+class Tracer:
+    """Keeps open spans by id and hands finished ones to an exporter."""
+
+    def __init__(self, exporter: JsonLinesExporter):
+        self.exporter = exporter
+        self._spans: dict[str, dict] = {}
+        self._thread_roots: dict[str, str] = {}
+        self._lock = Lock()
+
+    def start(
+        self,
+        span_id: str,
+        parent_id: str | None,
+        name: str,
+        kind: str,
+        **attributes: Any,
+    ) -> None:
+        with self._lock:
+            parent = self._spans.get(parent_id) if parent_id else None
+            self._spans[span_id] = {
+                "trace_id": parent["trace_id"] if parent else span_id,
+                "span_id": span_id,
+                "parent_id": parent_id if parent else None,
+                "name": name,
+                "kind": kind,
+                "start": time.time(),
+                "_started": time.perf_counter(),
+                "attributes": attributes,
+            }
+            thread_id = attributes.get("thread_id")
+            if parent is None and thread_id:
+                self._thread_roots[thread_id] = span_id
+
+    def annotate(self, span_id: str, **attributes: Any) -> None:
+        with self._lock:
+            span = self._spans.get(span_id)
+            if span is not None:
+                span["attributes"].update(attributes)
+
+    def end(self, span_id: str, error: BaseException | None = None, **attributes):
+        with self._lock:
+            span = self._spans.pop(span_id, None)
+            if span is None:
+                return
+            thread_id = span["attributes"].get("thread_id")
+            if self._thread_roots.get(thread_id) == span_id:
+                del self._thread_roots[thread_id]
+        span["duration_ms"] = (time.perf_counter() - span.pop("_started")) * 1000
+        span["status"] = "error" if error is not None else "ok"
+        if error is not None:
+            span["error"] = repr(error)
+        span["attributes"].update(attributes)
+        self.exporter.export(span)
+
+    def root_for_thread(self, thread_id: str) -> str | None:
+        with self._lock:
+            return self._thread_roots.get(thread_id)
+
+    def record(
+        self,
+        name: str,
+        kind: str,
+        duration_s: float,
+        parent_id: str | None = None,
+        **attributes: Any,
+    ) -> None:
+        """Exports a span that has already finished, e.g. a checkpoint write."""
+        span_id = str(uuid4())
+        self.start(span_id, parent_id, name, kind, **attributes)
+        with self._lock:
+            self._spans[span_id]["_started"] -= duration_s
+            self._spans[span_id]["start"] -= duration_s
+        self.end(span_id)
+
+    def close(self) -> None:
+        self.exporter.close()
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Turns LangChain callbacks into request, node, LLM and tool spans."""
+
+    run_inline = True
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        # Untraced runnables map to their closest traced ancestor
+        self._aliases: dict[UUID, str | None] = {}
+        self._token_counts: dict[UUID, int] = {}
+        self._node_spans: dict[str, str] = {}
+        self._lock = Lock()
+
+    def _parent(self, parent_run_id: UUID | None) -> str | None:
+        if parent_run_id is None:
+            return None
+        with self._lock:
+            if parent_run_id in self._aliases:
+                return self._aliases[parent_run_id]
+        return str(parent_run_id)
+
+    def on_chain_start(
+        self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs
+    ):
+        metadata = metadata or {}
+        name = kwargs.get("name") or (serialized or {}).get("name", "chain")
+        parent_id = self._parent(parent_run_id)
+        with self._lock:
+            # A node's runnable may carry the node's name as well; trace the outer one
+            is_node = (
+                name in TRACED_NODES
+                and metadata.get("langgraph_node") == name
+                and self._node_spans.get(parent_id) != name
+            )
+            if is_node:
+                self._node_spans[str(run_id)] = name
+        if parent_run_id is None:
+            self.tracer.start(
+                str(run_id),
+                None,
+                "request",
+                "request",
+                thread_id=metadata.get("thread_id"),
+            )
+        elif is_node:
+            self.tracer.start(
+                str(run_id),
+                parent_id,
+                name,
+                "node",
+                step=metadata.get("langgraph_step"),
+            )
+        else:
+            with self._lock:
+                self._aliases[run_id] = parent_id
+
+    def _end_chain(self, run_id: UUID, error: BaseException | None = None) -> None:
+        with self._lock:
+            if self._aliases.pop(run_id, _UNTRACED) is not _UNTRACED:
+                return
+            self._node_spans.pop(str(run_id), None)
+        self.tracer.end(str(run_id), error=error)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end_chain(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end_chain(run_id, error)
+
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id, parent_run_id=None, **kwargs
+    ):
+        params = kwargs.get("invocation_params") or {}
+        self.tracer.start(
+            str(run_id),
+            self._parent(parent_run_id),
+            "llm",
+            "llm",
+            model=params.get("model") or params.get("model_name"),
+            input_messages=sum(len(batch) for batch in messages),
+        )
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            count = self._token_counts.get(run_id, 0)
+            self._token_counts[run_id] = count + 1
+        if count == 0:
+            self.tracer.annotate(str(run_id), first_token_at=time.time())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            streamed = self._token_counts.pop(run_id, 0)
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self.tracer.end(
+            str(run_id),
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens") or streamed,
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._token_counts.pop(run_id, None)
+        self.tracer.end(str(run_id), error=error)
+
+    def on_tool_start(
+        self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs
+    ):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self.tracer.start(str(run_id), self._parent(parent_run_id), name, "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self.tracer.end(str(run_id))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self.tracer.end(str(run_id), error=error)
+
+
+_tracer: Tracer | None = None
+
+
+def configure_tracing(path: str | None) -> Tracer | None:
+    """Starts exporting spans to ``path``; tracing stays off without one."""
+    global _tracer
+    if path and _tracer is None:
+        _tracer = Tracer(JsonLinesExporter(path))
+        logger.info(f"Writing trace spans to {path}")
+    return _tracer
+
+
+def get_tracer() -> Tracer | None:
+    return _tracer
+
+
+def shutdown_tracing() -> None:
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
@@ -1,9 +1,12 @@
+import uuid
+
 from fastapi import WebSocket, APIRouter
 from fastapi.websockets import WebSocketDisconnect
 from llm_manager import LLMEngine
-from prompts import format_input, schema_validation
+from prompts import format_prompt, schema_validation, stream_event
 
 from utils.logger import CustomLogger
+from utils.metrics import OPEN_CONNECTIONS
 
 logger = CustomLogger(__name__)
 
@@ -12,8 +15,10 @@ websocket_router = APIRouter(prefix="", tags=["websocket"])
 
 @websocket_router.websocket("/stream")
 async def stream_websocket(websocket: WebSocket):
+    OPEN_CONNECTIONS.inc()
     try:
         await websocket.accept()
+        connection_session_id = str(uuid.uuid4())
         while True:
             parsed_data = await websocket.receive_json()
             logger.debug("Data received from WebSocket: %s", parsed_data)
@@ -25,8 +30,10 @@ async def stream_websocket(websocket: WebSocket):
                 continue
 
             messages = parsed_data["messages"]
+            session_id = str(parsed_data.get("session_id") or connection_session_id)
+            model = parsed_data.get("model")
 
-            await stream_model_response(messages, websocket)
+            await stream_model_response(messages, websocket, session_id, model)
     except WebSocketDisconnect:
         logger.exception("WebSocket disconnected.")
     except Exception as e:
@@ -36,25 +43,39 @@ async def stream_websocket(websocket: WebSocket):
         except Exception as send_error:
             logger.exception(f"Error sending error response: {send_error}")
     finally:
+        OPEN_CONNECTIONS.dec()
         if websocket.client_state.name != "DISCONNECTED":
             await websocket.close()
 
 
-async def stream_model_response(inputs: str, websocket: WebSocket):
+async def stream_model_response(
+    inputs: str,
+    websocket: WebSocket,
+    session_id: str | None = None,
+    model: str | None = None,
+):
     stream = True
     try:
-        prompt_template = format_input(inputs)
-        prompt = prompt_template.format(messages=inputs)
+        prompt = format_prompt(inputs)
 
-        logger.debug("Formatted prompt: %s", prompt)
+        worker_pool = getattr(websocket.app.state, "worker_pool", None)
+        if worker_pool is not None:
+            events = worker_pool.stream(prompt, session_id=session_id, model=model)
+            async for event in events:
+                await websocket.send_json(event)
+            await websocket.send_json({"done": True})
+            return
 
         engine = LLMEngine()
-        response = engine.infer(prompt, stream=stream)
+        response = engine.infer(
+            prompt, stream=stream, session_id=session_id, model=model
+        )
         if stream:
-            async for chunk in response:
-                token = schema_validation(chunk["messages"][-1])
-                if token and token.get("content"):
-                    await websocket.send_json({"token": token})
+            async for mode, payload in response:
+                event = stream_event(mode, payload)
+                if event:
+                    await websocket.send_json(event)
+            await websocket.send_json({"done": True})
         else:
             token = schema_validation(response["messages"][-1])
             if token and token.get("content"):
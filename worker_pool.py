@@ -0,0 +1,316 @@
+import asyncio
+import itertools
+import multiprocessing as mp
+import os
+import queue
+from collections import OrderedDict
+from multiprocessing.connection import wait
+from threading import Event, Lock, Thread
+
+from utils.logger import CustomLogger
+from utils.metrics import mark_process_dead
+
+logger = CustomLogger(__name__)
+
+
+def _worker_main(
+    index: int,
+    n_threads: int,
+    cpus: list[int] | None,
+    system_prefix: str | None,
+    model_kwargs: dict,
+    requests: mp.Queue,
+    events: mp.Queue,
+) -> None:
+    # ModelSettings is read inside the worker, so the thread count goes through env
+    os.environ["N_THREADS"] = str(n_threads)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    from llm_manager import LLMEngine
+
+    engine = LLMEngine(system_prefix=system_prefix, **model_kwargs)
+    engine.warmup()
+    events.put((None, "ready", index))
+    asyncio.run(_serve(engine, requests, events))
+    engine.close()
+
+
+async def _serve(engine, requests: mp.Queue, events: mp.Queue) -> None:
+    loop = asyncio.get_running_loop()
+    tasks: dict[int, asyncio.Task] = {}
+
+    async def run(
+        request_id: int, prompt: str, session_id: str | None, model: str | None
+    ) -> None:
+        from prompts import stream_event
+
+        try:
+            response = engine.infer(
+                prompt, stream=True, session_id=session_id, model=model
+            )
+            async for mode, payload in response:
+                event = stream_event(mode, payload)
+                if event:
+                    events.put((request_id, "event", event))
+            events.put((request_id, "done", None))
+        except asyncio.CancelledError:
+            events.put((request_id, "done", None))
+        except Exception as e:
+            logger.exception(f"Worker request {request_id} failed: {e}")
+            events.put((request_id, "error", str(e)))
+        finally:
+            tasks.pop(request_id, None)
+
+    while True:
+        message = await loop.run_in_executor(None, requests.get)
+        if message is None:
+            break
+        command, request_id, *args = message
+        if command == "infer":
+            tasks[request_id] = asyncio.create_task(run(request_id, *args))
+        elif command == "cancel" and request_id in tasks:
+            tasks[request_id].cancel()
+        elif command == "refresh_tools":
+            await loop.run_in_executor(None, engine.refresh_tools)
+
+    for task in list(tasks.values()):
+        task.cancel()
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    from utils.html_text import close_parse_pool
+    from utils.http_client import aclose_async_client, close_client
+
+    await aclose_async_client()
+    close_client()
+    close_parse_pool()
+
+
+class WorkerProcess:
+    def __init__(self, index: int, process, requests: mp.Queue):
+        self.index = index
+        self.process = process
+        self.requests = requests
+        self.in_flight = 0
+        self.alive = True
+
+
+class WorkerPool:
+    """Model worker processes behind the FastAPI front end.
+
+    Each worker loads its own ``LLMEngine`` with a fixed share of the CPU threads.
+    Requests go to the least loaded worker, except that a session sticks to the
+    worker holding its conversation state for as long as it is remembered.
+    """
+
+    def __init__(
+        self,
+        n_workers: int,
+        n_threads: int,
+        system_prefix: str | None = None,
+        pin_cpus: bool = False,
+        max_sessions: int = 10_000,
+        start_timeout: float = 600,
+        **model_kwargs,
+    ):
+        if n_workers < 1:
+            raise ValueError("Worker pool needs at least one worker")
+
+        self.n_workers = n_workers
+        self.threads_per_worker = max(1, n_threads // n_workers)
+        self.system_prefix = system_prefix
+        self.pin_cpus = pin_cpus
+        self.max_sessions = max_sessions
+        self.start_timeout = start_timeout
+        self.model_kwargs = model_kwargs
+
+        self.workers: list[WorkerProcess] = []
+        self._sessions: OrderedDict[str, WorkerProcess] = OrderedDict()
+        self._pending: dict[
+            int, tuple[asyncio.AbstractEventLoop, asyncio.Queue, WorkerProcess]
+        ] = {}
+        self._ids = itertools.count()
+        self._lock = Lock()
+        self._context = mp.get_context("spawn")
+        self._events = self._context.Queue()
+        self._reader: Thread | None = None
+        self._monitor: Thread | None = None
+        self._closing = Event()
+
+    def _cpu_sets(self) -> list[list[int] | None]:
+        if not self.pin_cpus or not hasattr(os, "sched_getaffinity"):
+            return [None] * self.n_workers
+        cpus = sorted(os.sched_getaffinity(0))
+        return [
+            cpus[i * self.threads_per_worker : (i + 1) * self.threads_per_worker]
+            or None
+            for i in range(self.n_workers)
+        ]
+
+    def start(self) -> None:
+        logger.info(
+            f"Starting {self.n_workers} model worker(s) "
+            f"with {self.threads_per_worker} thread(s) each"
+        )
+        for index, cpus in enumerate(self._cpu_sets()):
+            requests = self._context.Queue()
+            process = self._context.Process(
+                target=_worker_main,
+                args=(
+                    index,
+                    self.threads_per_worker,
+                    cpus,
+                    self.system_prefix,
+                    self.model_kwargs,
+                    requests,
+                    self._events,
+                ),
+                name=f"model-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            self.workers.append(WorkerProcess(index, process, requests))
+
+        ready = 0
+        while ready < self.n_workers:
+            try:
+                _, kind, index = self._events.get(timeout=self.start_timeout)
+            except queue.Empty:
+                self.close()
+                raise RuntimeError("Model workers did not start in time") from None
+            if kind == "ready":
+                ready += 1
+                logger.info(f"Model worker {index} ready")
+
+        self._reader = Thread(
+            target=self._read_events, name="worker-events", daemon=True
+        )
+        self._reader.start()
+        self._monitor = Thread(
+            target=self._watch_workers, name="worker-monitor", daemon=True
+        )
+        self._monitor.start()
+
+    def _read_events(self) -> None:
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            request_id, kind, payload = event
+            with self._lock:
+                target = self._pending.get(request_id)
+            if target is not None:
+                loop, results, _ = target
+                self._deliver(loop, results, kind, payload)
+
+    @staticmethod
+    def _deliver(loop, results: asyncio.Queue, kind: str, payload) -> None:
+        try:
+            loop.call_soon_threadsafe(results.put_nowait, (kind, payload))
+        except RuntimeError:  # event loop already closed
+            pass
+
+    def _watch_workers(self) -> None:
+        watching = {worker.process.sentinel: worker for worker in self.workers}
+        while watching and not self._closing.is_set():
+            for sentinel in wait(list(watching), timeout=1.0):
+                if not self._closing.is_set():
+                    self._on_worker_died(watching.pop(sentinel))
+
+    def _on_worker_died(self, worker: WorkerProcess) -> None:
+        """Fails the worker's pending turns, which would otherwise wait forever."""
+        logger.error(
+            f"Model worker {worker.index} died "
+            f"with exit code {worker.process.exitcode}"
+        )
+        mark_process_dead(worker.process.pid)
+        with self._lock:
+            worker.alive = False
+            for session_id in [
+                session_id
+                for session_id, owner in self._sessions.items()
+                if owner is worker
+            ]:
+                del self._sessions[session_id]
+            orphaned = [
+                (loop, results)
+                for loop, results, owner in self._pending.values()
+                if owner is worker
+            ]
+        for loop, results in orphaned:
+            self._deliver(loop, results, "error", "worker died")
+
+    def _route(self, session_id: str | None) -> WorkerProcess:
+        with self._lock:
+            worker = self._sessions.get(session_id) if session_id else None
+            if worker is None or not worker.alive:
+                alive = [w for w in self.workers if w.alive]
+                if not alive:
+                    raise RuntimeError("No model workers are running")
+                worker = min(alive, key=lambda w: w.in_flight)
+
+            if session_id:
+                self._sessions[session_id] = worker
+                self._sessions.move_to_end(session_id)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            worker.in_flight += 1
+            return worker
+
+    async def stream(
+        self, prompt: str, session_id: str | None = None, model: str | None = None
+    ):
+        """Yields the response events of one turn, as produced by ``stream_event``."""
+        worker = self._route(session_id)
+        request_id = next(self._ids)
+        results: asyncio.Queue = asyncio.Queue()
+        finished = False
+        try:
+            with self._lock:
+                if not worker.alive:
+                    # Died after routing, before the monitor could see this request
+                    raise RuntimeError("worker died")
+                self._pending[request_id] = (
+                    asyncio.get_running_loop(),
+                    results,
+                    worker,
+                )
+            worker.requests.put(("infer", request_id, prompt, session_id, model))
+            while True:
+                kind, payload = await results.get()
+                if kind == "event":
+                    yield payload
+                    continue
+                finished = True
+                if kind == "error":
+                    raise RuntimeError(payload)
+                return
+        finally:
+            if not finished and worker.alive:
+                worker.requests.put(("cancel", request_id))
+            with self._lock:
+                self._pending.pop(request_id, None)
+                worker.in_flight -= 1
+
+    def refresh_tools(self) -> None:
+        """Has every worker reload its tools, e.g. after ``prompts.refresh_tools``."""
+        for worker in self.workers:
+            if worker.alive:
+                worker.requests.put(("refresh_tools", None))
+
+    def close(self) -> None:
+        self._closing.set()
+        if self._monitor is not None:
+            self._monitor.join()
+        for worker in self.workers:
+            if worker.process.is_alive():
+                worker.requests.put(None)
+        for worker in self.workers:
+            worker.process.join(timeout=30)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            mark_process_dead(worker.process.pid)
+        if self._reader is not None:
+            self._events.put(None)
+            self._reader.join()
+        logger.info("Model workers stopped")